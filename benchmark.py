@@ -0,0 +1,344 @@
+"""
+Benchmark hors ligne de l'analyseur Cdiscount
+
+Les pages de recherche et les fiches produit enregistrées dans bench/fixtures sont
+servies par un serveur HTTP local (latence et robots.txt réglables), puis la chaîne
+complète est exécutée: search_products -> analyze_product -> scorer_produits ->
+sauvegarder_historique. Le rapport donne les pages/s, les latences p50/p95 de chaque
+étape et la mémoire maximale (RSS), comparés à la référence bench/baseline.json.
+
+    python benchmark.py                       # mesure et compare à la référence
+    python benchmark.py --sauver-reference    # remplace la référence
+    python benchmark.py --latence 80 --gigue 40 --workers 6
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import multiprocessing
+from string import Template
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote_plus
+
+DOSSIER_BENCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench")
+DOSSIER_FIXTURES = os.path.join(DOSSIER_BENCH, "fixtures")
+FICHIER_REFERENCE = os.path.join(DOSSIER_BENCH, "baseline.json")
+
+ETAPES = ["recherche", "produit", "score", "historique"]
+# Écart absolu en dessous duquel une latence n'est pas comparée (bruit de mesure)
+PLANCHER_MS = 0.1
+LIVRAISONS = ["Livraison gratuite", "Livraison express 24h", "Livraison en 3 à 5 jours",
+              "Livraison gratuite dès 25€", "Retrait en magasin"]
+
+# ====================================
+# SERVEUR LOCAL
+# ====================================
+def lire_fixture(nom):
+    with open(os.path.join(DOSSIER_FIXTURES, nom), "r", encoding="utf-8") as f:
+        return f.read()
+
+def fiche(sku):
+    """Données stables d'un produit fictif, tirées de son SKU"""
+    hasard = random.Random(sku)
+    prix = round(hasard.uniform(40, 900), 2)
+    dispo = "OutOfStock" if hasard.random() < 0.05 else "InStock"
+    return {
+        'sku': sku,
+        'offre': hasard.randint(10**6, 10**7),
+        'titre': f"Produit banc d'essai {sku.upper()} - {hasard.choice(['Noir', 'Blanc', 'Bleu'])} "
+                 f"{hasard.choice([64, 128, 256])} Go",
+        'slug': f"produit-banc-essai-{sku}",
+        'prix': f"{prix:.2f}",
+        'prix_texte': f"{prix:.2f}".replace(".", ",") + " €",
+        'prix_barre': f"{prix * 1.2:.2f}".replace(".", ",") + " €",
+        'note': f"{hasard.uniform(2.5, 5):.1f}",
+        'avis': hasard.randint(0, 2500),
+        'livraison': hasard.choice(LIVRAISONS),
+        'dispo': dispo,
+        'stock': "Épuisé" if dispo == "OutOfStock" else "En stock",
+        'description': " ".join(["Caractéristiques détaillées du produit."] * 40),
+    }
+
+class GestionnaireBench(BaseHTTPRequestHandler):
+    """Sert robots.txt, les pages de recherche et les fiches produit à partir des fixtures"""
+    options = {}
+    gabarits = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        latence = self.options['latence'] + random.uniform(0, self.options['gigue'])
+        if latence > 0:
+            time.sleep(latence / 1000)
+
+        if url.path == "/robots.txt":
+            return self._repondre(self.options['robots'], "text/plain")
+        if url.path.startswith("/search/10/"):
+            requete = unquote_plus(url.path[len("/search/10/"):].rsplit(".html", 1)[0])
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            return self._repondre(self._page_recherche(requete, page))
+        if "/f-" in url.path:
+            sku = url.path.rsplit("-", 1)[-1].rsplit(".html", 1)[0]
+            return self._repondre(self.gabarits['produit'].safe_substitute(fiche(sku)))
+        self._repondre("", code=404)
+
+    def _page_recherche(self, requete, page):
+        tuiles = []
+        # Au-delà de la dernière page, Cdiscount renvoie une page sans résultat
+        if page <= self.options['pages']:
+            # Mêmes SKU pour une même requête, d'un lancement à l'autre
+            prefixe = f"{zlib.crc32(requete.encode()) % 10**4:04d}p{page}"
+            for i in range(self.options['par_page']):
+                tuiles.append(self.gabarits['tuile'].safe_substitute(fiche(f"{prefixe}x{i:02d}")))
+        pagination = " ".join(f'<a href="?page={n}">{n}</a>' for n in range(1, self.options['pages'] + 1))
+        return self.gabarits['recherche'].safe_substitute(
+            requete=requete, page=page, tuiles="\n".join(tuiles), pagination=pagination)
+
+    def _repondre(self, corps, type_contenu="text/html; charset=utf-8", code=200):
+        donnees = corps.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", type_contenu)
+        self.send_header("Content-Length", str(len(donnees)))
+        self.end_headers()
+        self.wfile.write(donnees)
+
+    def log_message(self, format, *args):
+        pass
+
+def servir(options, file_port):
+    """Processus serveur: les pages sont générées hors du processus mesuré"""
+    GestionnaireBench.options = options
+    GestionnaireBench.gabarits = {nom: Template(lire_fixture(f"{nom}.html"))
+                                  for nom in ("recherche", "tuile", "produit")}
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), GestionnaireBench)
+    serveur.daemon_threads = True
+    file_port.put(serveur.server_address[1])
+    serveur.serve_forever()
+
+# ====================================
+# MESURES
+# ====================================
+class Mesures:
+    """Durées par étape, alimentées depuis plusieurs threads"""
+
+    def __init__(self):
+        self.durees = {etape: [] for etape in ETAPES}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def chrono(self, etape):
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - debut
+            with self._lock:
+                self.durees[etape].append(duree)
+
+def centile(valeurs, q):
+    """Centile par rang le plus proche (valeurs en secondes)"""
+    if not valeurs:
+        return 0
+    triees = sorted(valeurs)
+    return triees[min(len(triees) - 1, max(0, int(round(q / 100 * len(triees))) - 1))]
+
+def rss_max_mo():
+    """Mémoire résidente maximale du processus (None si indisponible, ex. Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sur macOS, en kilo-octets ailleurs
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+# ====================================
+# SCÉNARIO
+# ====================================
+def executer(args, url_site, dossier):
+    import main
+
+    # Rien n'est écrit dans le dossier data de l'utilisateur
+    main.FICHIER_ROBOTS = os.path.join(dossier, "robots_cache.json")
+    main.FICHIER_HISTO = os.path.join(dossier, "historique_prix.csv")
+    main.FICHIER_DOUBLONS = os.path.join(dossier, "doublons.db")
+    # Ordre des sélecteurs appris pendant la mesure uniquement, pour des mesures comparables
+    main.STATS_SELECTEURS = main.StatsSelecteurs(os.path.join(dossier, "selecteurs.json"))
+
+    mesures = Mesures()
+
+    class ScraperChronometre(main.CdiscountScraper):
+        def _liens_recherche(self, url, repli=True):
+            with mesures.chrono("recherche"):
+                return super()._liens_recherche(url, repli)
+
+        def analyze_product(self, url):
+            with mesures.chrono("produit"):
+                return super().analyze_product(url)
+
+    fetcher = main.HttpFetcher(pool_size=args.workers + 1)
+    scraper = ScraperChronometre(fetcher=fetcher, workers=args.workers, url_site=url_site,
+                                 liste_seule=args.liste)
+    scraper.robots.crawl_delay = args.delai
+    store = main.PriceStore(os.path.join(dossier, "historique_prix.db"))
+    moteur = main.MoteurRegles()
+    nb_produits = 0
+
+    debut = time.perf_counter()
+    try:
+        for i in range(args.requetes):
+            produits = scraper.search_products(f"banc essai {i % args.requetes_distinctes}",
+                                               max_pages=args.pages, max_produits=args.limite)
+            with mesures.chrono("score"):
+                main.scorer_produits(produits)
+            with mesures.chrono("historique"):
+                main.sauvegarder_historique(produits, store=store, moteur=moteur)
+            nb_produits += len(produits)
+    finally:
+        scraper.close()
+    duree = time.perf_counter() - debut
+
+    pages = len(mesures.durees["recherche"]) + len(mesures.durees["produit"])
+    extraites = main.METRIQUES.instantane()['compteurs']
+    essais = sum(c['valeur'] for c in extraites if c['nom'] == "selecteurs_essayes_total")
+    analysees = sum(c['valeur'] for c in extraites if c['nom'] == "pages_extraites_total")
+    return {
+        'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'plateforme': platform.platform(),
+        'parametres': parametres(args),
+        'duree_s': round(duree, 3),
+        'pages': pages,
+        'produits': nb_produits,
+        'pages_par_seconde': round(pages / duree, 2) if duree else 0,
+        'produits_par_seconde': round(nb_produits / duree, 2) if duree else 0,
+        'rss_max_mo': rss_max_mo(),
+        'selecteurs_par_page': round(essais / analysees, 3) if analysees else 0,
+        'etapes': {etape: {'n': len(valeurs),
+                           'p50_ms': round(centile(valeurs, 50) * 1000, 3),
+                           'p95_ms': round(centile(valeurs, 95) * 1000, 3)}
+                   for etape, valeurs in mesures.durees.items()},
+    }
+
+def parametres(args):
+    """Paramètres qui doivent être identiques pour que deux mesures soient comparables"""
+    return {cle: getattr(args, cle) for cle in ("requetes", "requetes_distinctes", "pages", "par_page",
+                                               "limite", "workers", "latence", "gigue", "delai", "liste")}
+
+# ====================================
+# COMPARAISON
+# ====================================
+def comparer(resultat, reference, tolerance):
+    """Affiche l'écart à la référence et renvoie la liste des régressions"""
+    if reference.get('parametres') != resultat['parametres']:
+        print("⚠️ Paramètres différents de la référence: comparaison indicative")
+
+    # (libellé, valeur actuelle, valeur de référence, plus grand = mieux)
+    lignes = [("pages/s", resultat['pages_par_seconde'], reference.get('pages_par_seconde'), True),
+              ("produits/s", resultat['produits_par_seconde'], reference.get('produits_par_seconde'), True),
+              ("RSS max (Mo)", resultat['rss_max_mo'], reference.get('rss_max_mo'), False)]
+    for etape in ETAPES:
+        actuel = resultat['etapes'][etape]
+        ancien = reference.get('etapes', {}).get(etape, {})
+        for cle in ("p50_ms", "p95_ms"):
+            lignes.append((f"{etape} {cle}", actuel[cle], ancien.get(cle), False))
+
+    regressions = []
+    print(f"\n{'mesure':<22}{'référence':>12}{'actuel':>12}{'écart':>10}")
+    for libelle, actuel, ancien, plus_grand_mieux in lignes:
+        if actuel is None or not ancien:
+            print(f"{libelle:<22}{'-':>12}{str(actuel):>12}")
+            continue
+        ecart = (actuel - ancien) / ancien
+        degradation = -ecart if plus_grand_mieux else ecart
+        marque = ""
+        if degradation > tolerance and not (libelle.endswith("_ms") and abs(actuel - ancien) < PLANCHER_MS):
+            marque = " ❌"
+            regressions.append(libelle)
+        print(f"{libelle:<22}{ancien:>12}{actuel:>12}{ecart:>+10.1%}{marque}")
+    return regressions
+
+def afficher(resultat):
+    print(f"\n📊 {resultat['pages']} pages, {resultat['produits']} produits en {resultat['duree_s']} s "
+          f"-> {resultat['pages_par_seconde']} pages/s, {resultat['produits_par_seconde']} produits/s, RSS max {resultat['rss_max_mo']} Mo")
+    print(f"   {resultat.get('selecteurs_par_page', 0)} sélecteur(s) de prix essayé(s) par fiche ou tuile")
+    for etape, stats in resultat['etapes'].items():
+        print(f"   {etape:<11} n={stats['n']:<5} p50={stats['p50_ms']:.2f} ms  p95={stats['p95_ms']:.2f} ms")
+
+# ====================================
+# POINT D'ENTRÉE
+# ====================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne de l'analyseur Cdiscount")
+    parser.add_argument("--requetes", type=int, default=12, help="recherches exécutées")
+    parser.add_argument("--requetes-distinctes", type=int, default=4,
+                        help="requêtes différentes (les autres sont des relevés répétés)")
+    parser.add_argument("--pages", type=int, default=2, help="pages de résultats servies par requête")
+    parser.add_argument("--par-page", type=int, default=20, help="produits par page de résultats")
+    parser.add_argument("--limite", type=int, default=30, help="produits analysés par requête")
+    parser.add_argument("--workers", type=int, default=3, help="fiches analysées en parallèle")
+    parser.add_argument("--latence", type=float, default=20, help="latence du serveur (ms)")
+    parser.add_argument("--gigue", type=float, default=10, help="latence aléatoire ajoutée (ms)")
+    parser.add_argument("--delai", type=float, default=0,
+                        help="délai de politesse entre requêtes (s), remplacé par le Crawl-delay du robots.txt")
+    parser.add_argument("--liste", action="store_true",
+                        help="mode liste: produits lus sur les pages de résultats")
+    parser.add_argument("--robots", default=os.path.join(DOSSIER_FIXTURES, "robots.txt"),
+                        help="robots.txt servi par le serveur local")
+    parser.add_argument("--reference", default=FICHIER_REFERENCE, help="fichier de référence")
+    parser.add_argument("--sauver-reference", action="store_true",
+                        help="enregistre cette mesure comme nouvelle référence")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="dégradation tolérée avant de signaler une régression (0.25 = 25 %%)")
+    parser.add_argument("--sortie", help="écrit aussi le résultat JSON dans ce fichier")
+    args = parser.parse_args(argv)
+
+    with open(args.robots, "r", encoding="utf-8") as f:
+        robots = f.read()
+    options = {'latence': args.latence, 'gigue': args.gigue, 'robots': robots,
+               'pages': args.pages, 'par_page': args.par_page}
+
+    file_port = multiprocessing.Queue()
+    serveur = multiprocessing.Process(target=servir, args=(options, file_port), daemon=True)
+    serveur.start()
+    try:
+        url_site = f"http://127.0.0.1:{file_port.get(timeout=30)}"
+        print(f"🧪 Serveur local: {url_site}")
+        with tempfile.TemporaryDirectory() as dossier:
+            resultat = executer(args, url_site, dossier)
+    finally:
+        serveur.terminate()
+        serveur.join()
+
+    afficher(resultat)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            json.dump(resultat, f, ensure_ascii=False, indent=2)
+
+    if args.sauver_reference:
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump(resultat, f, ensure_ascii=False, indent=2)
+        print(f"💾 Référence enregistrée: {args.reference}")
+        return 0
+
+    if not os.path.exists(args.reference):
+        print("ℹ️ Pas encore de référence (--sauver-reference pour en créer une)")
+        return 0
+    with open(args.reference, "r", encoding="utf-8") as f:
+        reference = json.load(f)
+    regressions = comparer(resultat, reference, args.tolerance)
+    if regressions:
+        print(f"\n❌ Régressions au-delà de {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n✅ Pas de régression")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,20 +13,21 @@ import json
 # ====================================
 # AUTO-INSTALLATION
 # ====================================
+# Paquet pip -> module importé
+PACKAGES = {
+    "selenium": "selenium",
+    "webdriver-manager": "webdriver_manager",
+    "requests": "requests",
+    "beautifulsoup4": "bs4",
+}
+
 def auto_install():
-    """Installe tout automatiquement"""
+    """Installe les dépendances manquantes (python main.py --setup, plus à chaque lancement)"""
     print("🔧 Installation automatique...")
     
-    packages = [
-        "selenium",
-        "webdriver-manager",
-        "requests",
-        "beautifulsoup4"
-    ]
-    
-    for package in packages:
+    for package, module in PACKAGES.items():
         try:
-            if importlib.util.find_spec(package.replace("-", "_")) is None:
+            if importlib.util.find_spec(module) is None:
                 print(f"📦 Installation de {package}...")
                 subprocess.check_call([sys.executable, "-m", "pip", "install", package])
                 print(f"✅ {package} installé")
@@ -35,21 +36,13 @@ def auto_install():
     
     print("✅ Installation terminée!\n")
 
-auto_install()
-
 # ====================================
 # IMPORTS
 # ====================================
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-import tkinter as tk
-from tkinter import messagebox, simpledialog
 import csv
+import sqlite3
+import zlib
+import hashlib
 import re
 import time
 import os
@@ -57,12 +50,28 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urljoin, parse_qs
 import urllib.robotparser
+import urllib.request
+import urllib.error
 import logging
 import argparse
 import platform
 import tempfile
+import queue
+import threading
+import multiprocessing
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+import heapq
+import cProfile
+import pstats
+import itertools
+import bisect
+import random
+import array
+import unicodedata
+from collections import deque
 
 # ====================================
 # CONFIGURATION
@@ -74,13 +83,461 @@ def get_data_dir():
     return directory
 
 DATA_DIR = get_data_dir()
-FICHIER_HISTO = os.path.join(DATA_DIR, "historique_prix.csv")
+FICHIER_HISTO = os.path.join(DATA_DIR, "historique_prix.csv")  # ancien format, importé une fois
+FICHIER_DB = os.path.join(DATA_DIR, "historique_prix.db")
+FICHIER_OUTBOX = os.path.join(DATA_DIR, "outbox.db")
+FICHIER_CACHE = os.path.join(DATA_DIR, "cache_pages.db")
+FICHIER_ARCHIVE = os.path.join(DATA_DIR, "archive_pages.db")
 FICHIER_LOG = os.path.join(DATA_DIR, "scraper.log")
 FICHIER_CONFIG = os.path.join(DATA_DIR, "config.json")
+FICHIER_ROBOTS = os.path.join(DATA_DIR, "robots_cache.json")
+FICHIER_PILOTES = os.path.join(DATA_DIR, "pilotes.json")
+FICHIER_TRAVAUX = os.path.join(DATA_DIR, "travaux.db")
 
 logging.basicConfig(level=logging.INFO, filename=FICHIER_LOG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# tkinter n'est importé que par l'interface graphique (le mode batch tourne sans écran)
+tk = None
+ttk = None
+messagebox = None
+
+def charger_tkinter():
+    """Importe tkinter au premier lancement de l'interface graphique"""
+    global tk, ttk, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as tk_ttk, messagebox as tk_messagebox
+        tk = tkinter
+        ttk = tk_ttk
+        messagebox = tk_messagebox
+
+# Selenium, requests et BeautifulSoup ne sont importés qu'au premier usage (démarrage rapide)
+webdriver = None
+By = None
+Service = None
+Options = None
+WebDriverWait = None
+EC = None
+requests = None
+BeautifulSoup = None
+
+class DependanceManquante(ImportError):
+    """Module tiers absent: l'installer avec python main.py --setup"""
+
+def charger_selenium():
+    """Importe Selenium au premier lancement d'un navigateur"""
+    global webdriver, By, Service, Options, WebDriverWait, EC
+    if webdriver is None:
+        try:
+            from selenium import webdriver as se_webdriver
+            from selenium.webdriver.common.by import By as se_By
+            from selenium.webdriver.chrome.service import Service as se_Service
+            from selenium.webdriver.chrome.options import Options as se_Options
+            from selenium.webdriver.support.ui import WebDriverWait as se_WebDriverWait
+            from selenium.webdriver.support import expected_conditions as se_EC
+        except ImportError as e:
+            raise DependanceManquante(f"{e.name} n'est pas installé: lancez python main.py --setup") from e
+        By, Service, Options, WebDriverWait, EC = se_By, se_Service, se_Options, se_WebDriverWait, se_EC
+        webdriver = se_webdriver
+
+def charger_http():
+    """Importe requests et BeautifulSoup à la première page récupérée sans navigateur"""
+    global requests, BeautifulSoup
+    if BeautifulSoup is None:
+        try:
+            import requests as rq
+            from bs4 import BeautifulSoup as Soup
+        except ImportError as e:
+            raise DependanceManquante(f"{e.name} n'est pas installé: lancez python main.py --setup") from e
+        requests = rq
+        BeautifulSoup = Soup
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Sélecteurs partagés par le backend HTTP et le backend Selenium
+SELECTEUR_LIENS = "a[href*='/f-']"
+SELECTEURS_PRIX = ["span[itemprop='price']", ".price", ".prdtPrice", "span.sc-e4stwg-1"]
+# Balisage structuré du prix du produit: toujours essayé avant les classes génériques
+# (.price peut aussi désigner un produit associé ou un accessoire sur la même page)
+SELECTEURS_PRIX_PRIORITAIRES = ["span[itemprop='price']"]
+SELECTEUR_NOTE = "span.ratingValue, .ac_rating"
+# Mode liste: un prix lu sur une tuile hors de cet intervalle est vérifié sur la fiche produit
+PRIX_PLAUSIBLES = (1, 50000)
+# Tuile sans donnée structurée de disponibilité: produit épuisé si son texte l'indique
+RE_EPUISE = re.compile(r"épuisé|indisponible|rupture de stock", re.IGNORECASE)
+# Le prix (ou les données structurées qui le portent) suffit pour lire une fiche produit
+SELECTEUR_ATTENTE_PRIX = ", ".join(SELECTEURS_PRIX + ["script[type='application/ld+json']"])
+
+# ====================================
+# MÉTRIQUES
+# ====================================
+FICHIER_METRIQUES_PROM = os.path.join(DATA_DIR, "metriques.prom")
+FICHIER_METRIQUES_JSON = os.path.join(DATA_DIR, "metriques.json")
+
+class Metriques:
+    """
+    Compteurs et histogrammes de durées par étape (navigateur, pages, sélecteurs,
+    robots.txt, politesse, historique, SMTP), partagés par tous les threads et
+    exportés dans DATA_DIR au format texte Prometheus et en instantané JSON
+    """
+    PREFIXE = "cdiscount"
+    BORNES = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+    
+    def __init__(self):
+        self._compteurs = {}    # (nom, labels) -> valeur
+        self._histogrammes = {} # (nom, labels) -> [comptes par borne..., +Inf], somme
+        self._lock = threading.Lock()
+        self._dernier_export = 0
+    
+    def incrementer(self, nom, valeur=1, **labels):
+        cle = (nom, tuple(sorted(labels.items())))
+        with self._lock:
+            self._compteurs[cle] = self._compteurs.get(cle, 0) + valeur
+    
+    def observer(self, nom, duree, **labels):
+        cle = (nom, tuple(sorted(labels.items())))
+        with self._lock:
+            comptes, somme = self._histogrammes.get(cle) or ([0] * (len(self.BORNES) + 1), 0)
+            comptes[bisect.bisect_left(self.BORNES, duree)] += 1
+            self._histogrammes[cle] = (comptes, somme + duree)
+    
+    @contextmanager
+    def chrono(self, etape, **labels):
+        """Mesure la durée du bloc dans l'histogramme de l'étape (les erreurs sont comptées à part)"""
+        debut = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.incrementer("erreurs_total", etape=etape, **labels)
+            raise
+        finally:
+            self.observer("duree_secondes", time.perf_counter() - debut, etape=etape, **labels)
+    
+    def instantane(self):
+        """Copie JSON des métriques: compteurs, puis histogrammes avec centiles approchés"""
+        with self._lock:
+            compteurs = list(self._compteurs.items())
+            histogrammes = [(cle, list(comptes), somme) for cle, (comptes, somme) in self._histogrammes.items()]
+        
+        resultat = {'horodatage': int(time.time()), 'compteurs': [], 'histogrammes': []}
+        for (nom, labels), valeur in compteurs:
+            resultat['compteurs'].append({'nom': nom, 'labels': dict(labels), 'valeur': valeur})
+        for (nom, labels), comptes, somme in histogrammes:
+            total = sum(comptes)
+            resultat['histogrammes'].append({
+                'nom': nom, 'labels': dict(labels), 'total': total, 'somme': round(somme, 6),
+                'moyenne': round(somme / total, 6) if total else 0,
+                'p50': self._centile(comptes, total, 0.5), 'p95': self._centile(comptes, total, 0.95),
+            })
+        return resultat
+    
+    def _centile(self, comptes, total, q):
+        """Borne supérieure du premier intervalle qui atteint le centile"""
+        cumul = 0
+        for borne, compte in zip(self.BORNES + [None], comptes):
+            cumul += compte
+            if total and cumul >= q * total:
+                return borne
+        return None
+    
+    def vers_prometheus(self):
+        """Format d'exposition texte de Prometheus (lisible par le textfile collector)"""
+        with self._lock:
+            compteurs = sorted(self._compteurs.items())
+            histogrammes = sorted((cle, list(comptes), somme) for cle, (comptes, somme) in self._histogrammes.items())
+        
+        lignes = []
+        types = set()
+        for (nom, labels), valeur in compteurs:
+            nom = f"{self.PREFIXE}_{nom}"
+            if nom not in types:
+                types.add(nom)
+                lignes.append(f"# TYPE {nom} counter")
+            lignes.append(f"{nom}{self._labels(labels)} {valeur}")
+        for (nom, labels), comptes, somme in histogrammes:
+            nom = f"{self.PREFIXE}_{nom}"
+            if nom not in types:
+                types.add(nom)
+                lignes.append(f"# TYPE {nom} histogram")
+            cumul = 0
+            for borne, compte in zip(self.BORNES + ["+Inf"], comptes):
+                cumul += compte
+                lignes.append(f"{nom}_bucket{self._labels(labels + (('le', str(borne)),))} {cumul}")
+            lignes.append(f"{nom}_sum{self._labels(labels)} {somme:.6f}")
+            lignes.append(f"{nom}_count{self._labels(labels)} {cumul}")
+        return "\n".join(lignes) + "\n"
+    
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        echappe = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{cle}="{echappe(valeur)}"' for cle, valeur in labels) + "}"
+    
+    def sauver_etat(self, chemin):
+        """Compteurs et histogrammes bruts d'un processus de travail, fusionnés ensuite par le parent"""
+        with self._lock:
+            etat = {'compteurs': [[nom, list(labels), valeur] for (nom, labels), valeur in self._compteurs.items()],
+                    'histogrammes': [[nom, list(labels), list(comptes), somme]
+                                     for (nom, labels), (comptes, somme) in self._histogrammes.items()]}
+        try:
+            with open(chemin, "w", encoding="utf-8") as f:
+                json.dump(etat, f)
+        except Exception as e:
+            logger.error(f"Erreur sauvegarde métriques: {e}")
+    
+    def fusionner(self, chemin):
+        """Ajoute les métriques sauvées par sauver_etat (le fichier est supprimé)"""
+        try:
+            with open(chemin, "r", encoding="utf-8") as f:
+                etat = json.load(f)
+            os.remove(chemin)
+        except Exception as e:
+            logger.error(f"Erreur fusion métriques: {e}")
+            return
+        with self._lock:
+            for nom, labels, valeur in etat['compteurs']:
+                cle = (nom, tuple(tuple(l) for l in labels))
+                self._compteurs[cle] = self._compteurs.get(cle, 0) + valeur
+            for nom, labels, comptes, somme in etat['histogrammes']:
+                cle = (nom, tuple(tuple(l) for l in labels))
+                anciens, ancienne_somme = self._histogrammes.get(cle) or ([0] * (len(self.BORNES) + 1), 0)
+                self._histogrammes[cle] = ([a + c for a, c in zip(anciens, comptes)], ancienne_somme + somme)
+    
+    def exporter(self, intervalle=0):
+        """
+        Écrit metriques.prom et metriques.json (remplacement atomique).
+        intervalle : n'écrit pas si le dernier export date de moins de `intervalle` secondes
+        """
+        if intervalle and time.monotonic() - self._dernier_export < intervalle:
+            return
+        self._dernier_export = time.monotonic()
+        try:
+            for chemin, contenu in ((FICHIER_METRIQUES_PROM, self.vers_prometheus()),
+                                    (FICHIER_METRIQUES_JSON, json.dumps(self.instantane(), ensure_ascii=False, indent=2))):
+                temporaire = chemin + ".tmp"
+                with open(temporaire, "w", encoding="utf-8") as f:
+                    f.write(contenu)
+                os.replace(temporaire, chemin)
+        except Exception as e:
+            logger.error(f"Erreur export métriques: {e}")
+
+METRIQUES = Metriques()
+
+@contextmanager
+def profil_execution(actif):
+    """
+    cProfile optionnel pour tout un lancement: le thread principal et chaque thread
+    démarré pendant le profil ont leur profileur, fusionnés dans DATA_DIR/profil-<date>.pstats
+    """
+    if not actif:
+        yield
+        return
+    
+    profils = []
+    def activer(*_):
+        # Premier événement du nouveau thread: son profileur remplace ce crochet
+        profil = cProfile.Profile()
+        profils.append(profil)
+        profil.enable()
+    
+    principal = cProfile.Profile()
+    threading.setprofile(activer)
+    principal.enable()
+    try:
+        yield
+    finally:
+        principal.disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(principal)
+        for profil in profils:
+            try:
+                stats.add(profil)
+            except Exception:
+                pass
+        chemin = os.path.join(DATA_DIR, f"profil-{datetime.now().strftime('%Y%m%d-%H%M%S')}.pstats")
+        stats.dump_stats(chemin)
+        print(f"📈 Profil enregistré: {chemin} (python -m pstats {os.path.basename(chemin)})", file=sys.stderr)
+
+# ====================================
+# STATISTIQUES DES SÉLECTEURS DE PRIX
+# ====================================
+FICHIER_SELECTEURS = os.path.join(DATA_DIR, "selecteurs.json")
+
+class StatsSelecteurs:
+    """
+    Taux de succès et durée de chaque sélecteur de prix, par contexte ("produit" pour
+    les fiches, "tuile" pour les résultats), persistés dans DATA_DIR d'un lancement à
+    l'autre: l'extraction essaie d'abord les sélecteurs qui trouvent le plus souvent
+    un prix et s'arrête au premier qui en donne un.
+    """
+    LISSAGE = 0.1       # poids d'une page dans le taux de succès récent (moyenne mobile)
+    SEUIL_DERIVE = 3    # pages d'affilée où le sélecteur échoue alors que le prix est lu ailleurs
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or FICHIER_SELECTEURS
+        self.candidats = list(SELECTEURS_PRIX)
+        self._stats = None  # contexte -> {'pages', 'essais', 'sans_prix', 'selecteurs': {s: {...}}}
+        self._deltas = {}   # compteurs accumulés depuis la dernière sauvegarde, même forme
+        self._derives = set()
+        self._lock = threading.Lock()
+        self._dernier_export = 0
+
+    def ordre(self, contexte):
+        """
+        Candidats par priorité fixe (balisage structuré d'abord), puis du plus fiable
+        au moins fiable dans une même priorité (taux récent, puis durée moyenne)
+        """
+        with self._lock:
+            selecteurs = self._contexte(self._vue(), contexte)['selecteurs']
+            def rang(s):
+                # Un sélecteur générique qui réussit ne doit jamais passer devant itemprop,
+                # qui ne serait alors plus essayé (arrêt au premier prix trouvé)
+                priorite = 0 if s in SELECTEURS_PRIX_PRIORITAIRES else 1
+                st = selecteurs.get(s)
+                if not st:
+                    return (priorite, -0.5, 0)  # nouveau candidat: essayé avant les sélecteurs en échec
+                return (priorite, -st['taux'], st['duree'] / st['essais'] if st['essais'] else 0)
+            # Tri stable: l'ordre de SELECTEURS_PRIX départage les ex aequo
+            return sorted(self.candidats, key=rang)
+
+    def enregistrer(self, contexte, essais, prix_page=True):
+        """
+        essais : [(sélecteur, prix trouvé, durée en secondes), ...] dans l'ordre d'essai d'une page
+        prix_page : la page a un prix (lu par un sélecteur ou dans les données structurées)
+        """
+        with self._lock:
+            vue = self._contexte(self._vue(), contexte)
+            delta = self._contexte(self._deltas, contexte)
+            for cible in (vue, delta):
+                cible['pages'] += 1
+                cible['essais'] += len(essais)
+                cible['sans_prix'] += not any(trouve for _, trouve, _ in essais)
+
+            for selecteur, trouve, duree in essais:
+                st = vue['selecteurs'].setdefault(selecteur, self._nouveau())
+                d = delta['selecteurs'].setdefault(selecteur, self._nouveau())
+                for cible in (st, d):
+                    cible['essais'] += 1
+                    cible['succes'] += trouve
+                    cible['duree'] += duree
+                st['taux'] += self.LISSAGE * (trouve - st['taux'])
+                if trouve:
+                    st['serie'] = d['serie'] = 0
+                    st['dernier_succes'] = d['dernier_succes'] = int(time.time())
+                    self._derives.discard((contexte, selecteur))
+                elif prix_page:
+                    # Le prix est bien sur la page mais ce sélecteur ne le trouve plus
+                    st['serie'] += 1
+                    d['serie'] += 1
+                    self._signaler_derive(contexte, selecteur, st)
+
+        METRIQUES.incrementer("pages_extraites_total", contexte=contexte)
+        METRIQUES.incrementer("selecteurs_essayes_total", len(essais), contexte=contexte)
+        if not any(trouve for _, trouve, _ in essais):
+            METRIQUES.incrementer("pages_sans_selecteur_total", contexte=contexte)
+
+    def _signaler_derive(self, contexte, selecteur, st):
+        """Un sélecteur qui trouvait des prix n'en trouve plus: balisage probablement modifié"""
+        if st['serie'] < self.SEUIL_DERIVE or not st['succes'] or (contexte, selecteur) in self._derives:
+            return
+        self._derives.add((contexte, selecteur))
+        METRIQUES.incrementer("selecteur_derive_total", contexte=contexte, selecteur=selecteur)
+        logger.warning(f"Sélecteur de prix '{selecteur}' ({contexte}): aucun prix sur les "
+                       f"{st['serie']} dernières pages qui en ont un, le balisage a peut-être changé")
+
+    def sauver(self, intervalle=0):
+        """
+        Ajoute les compteurs du lancement au fichier (relu juste avant: d'autres
+        processus ont pu l'enrichir), puis le remplace de façon atomique
+        """
+        if intervalle and time.monotonic() - self._dernier_export < intervalle:
+            return
+        self._dernier_export = time.monotonic()
+        with self._lock:
+            if not self._deltas:
+                return
+            vue = self._vue()
+            stats = self._charger()
+            for contexte, delta in self._deltas.items():
+                cible = self._contexte(stats, contexte)
+                for champ in ('pages', 'essais', 'sans_prix'):
+                    cible[champ] += delta[champ]
+                for selecteur, d in delta['selecteurs'].items():
+                    st = cible['selecteurs'].setdefault(selecteur, self._nouveau())
+                    for champ in ('essais', 'succes', 'duree'):
+                        st[champ] += d[champ]
+                    # Série en cours: celle du lancement s'il a trouvé un prix, sinon prolongée
+                    st['serie'] = d['serie'] if d['dernier_succes'] else st['serie'] + d['serie']
+                    st['dernier_succes'] = max(st['dernier_succes'], d['dernier_succes'])
+                    st['taux'] = vue[contexte]['selecteurs'][selecteur]['taux']
+            try:
+                temporaire = self.chemin + ".tmp"
+                with open(temporaire, "w", encoding="utf-8") as f:
+                    json.dump(self._resume(stats), f, ensure_ascii=False, indent=2)
+                os.replace(temporaire, self.chemin)
+            except Exception as e:
+                logger.error(f"Erreur statistiques sélecteurs: {e}")
+                return
+            self._stats = stats
+            self._deltas = {}
+
+    def _vue(self):
+        """Statistiques courantes (fichier + lancement), chargées au premier usage"""
+        if self._stats is None:
+            self._stats = self._charger()
+            for contexte, donnees in self._stats.items():
+                for selecteur, st in donnees['selecteurs'].items():
+                    if st['serie'] >= self.SEUIL_DERIVE and st['succes']:
+                        self._derives.add((contexte, selecteur))
+        return self._stats
+
+    def _charger(self):
+        stats = {}
+        if os.path.exists(self.chemin):
+            try:
+                with open(self.chemin, "r", encoding="utf-8") as f:
+                    for contexte, donnees in json.load(f).items():
+                        cible = self._contexte(stats, contexte)
+                        for champ in ('pages', 'essais', 'sans_prix'):
+                            cible[champ] = donnees.get(champ, 0)
+                        for selecteur, st in (donnees.get('selecteurs') or {}).items():
+                            cible['selecteurs'][selecteur] = {cle: st.get(cle, defaut) for cle, defaut in self._nouveau().items()}
+            except Exception as e:
+                logger.error(f"Erreur lecture statistiques sélecteurs: {e}")
+        return stats
+
+    def _resume(self, stats):
+        """Fichier lisible: compteurs bruts, plus taux, durée moyenne et essais par page"""
+        resume = {}
+        for contexte, donnees in stats.items():
+            resume[contexte] = dict(donnees, essais_par_page=round(donnees['essais'] / donnees['pages'], 3) if donnees['pages'] else 0,
+                                    selecteurs={})
+            for selecteur, st in donnees['selecteurs'].items():
+                resume[contexte]['selecteurs'][selecteur] = dict(
+                    st, duree=round(st['duree'], 6), taux=round(st['taux'], 4),
+                    duree_moyenne_ms=round(1000 * st['duree'] / st['essais'], 3) if st['essais'] else 0,
+                    derive=(contexte, selecteur) in self._derives)
+        return resume
+
+    @staticmethod
+    def _contexte(stats, contexte):
+        return stats.setdefault(contexte, {'pages': 0, 'essais': 0, 'sans_prix': 0, 'selecteurs': {}})
+
+    @staticmethod
+    def _nouveau():
+        return {'essais': 0, 'succes': 0, 'duree': 0.0, 'taux': 0.5, 'serie': 0, 'dernier_succes': 0}
+
+STATS_SELECTEURS = StatsSelecteurs()
+
+def charger_selecteurs(config):
+    """Ajoute aux sélecteurs de prix les candidats de config.json (clé "selecteurs_prix")"""
+    global SELECTEUR_ATTENTE_PRIX
+    extras = [s for s in config.get('selecteurs_prix') or [] if isinstance(s, str) and s.strip()]
+    STATS_SELECTEURS.candidats = list(dict.fromkeys(SELECTEURS_PRIX + extras))
+    SELECTEUR_ATTENTE_PRIX = ", ".join(STATS_SELECTEURS.candidats + ["script[type='application/ld+json']"])
+
 # ====================================
 # GESTIONNAIRE DE CONFIGURATION EMAIL
 # ====================================
@@ -100,10 +557,14 @@ class EmailConfig:
     
     @staticmethod
     def save(config):
-        """Sauvegarde la configuration"""
+        """Sauvegarde la configuration (les clés absentes de `config` sont conservées)"""
         try:
-            with open(FICHIER_CONFIG, 'w') as f:
-                json.dump(config, f)
+            complete = EmailConfig.load()
+            complete.update(config)
+            temporaire = FICHIER_CONFIG + ".tmp"
+            with open(temporaire, 'w') as f:
+                json.dump(complete, f)
+            os.replace(temporaire, FICHIER_CONFIG)
             return True
         except:
             return False
@@ -164,11 +625,147 @@ class EmailConfig:
 # ====================================
 # GESTIONNAIRE CHROME
 # ====================================
+class NavigateurIndisponible(RuntimeError):
+    """Aucun navigateur n'a pu être lancé (l'appelant décide comment le signaler)"""
+
+_pilotes = {}  # navigateur -> (chemin du driver, lu dans pilotes.json)
+_pilotes_lock = threading.Lock()
+
+def _charger_pilotes():
+    """Drivers mémorisés (fichier à part: config.json reste la configuration de l'utilisateur)"""
+    if os.path.exists(FICHIER_PILOTES):
+        try:
+            with open(FICHIER_PILOTES, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except:
+            pass
+    return {}
+
+def _sauver_pilotes(pilotes):
+    try:
+        temporaire = FICHIER_PILOTES + ".tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump(pilotes, f)
+        os.replace(temporaire, FICHIER_PILOTES)
+    except Exception as e:
+        logger.error(f"Erreur mémorisation du driver: {e}")
+
+def _gestionnaire_pilote(navigateur):
+    if navigateur == "edge":
+        from webdriver_manager.microsoft import EdgeChromiumDriverManager
+        return EdgeChromiumDriverManager()
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager()
+
+def _version_majeure(version):
+    return str(version or "").split(".")[0]
+
+def chemin_pilote(navigateur):
+    """
+    Chemin du driver de 'chrome' ou 'edge'. webdriver-manager (réseau) n'est appelé
+    qu'une fois: le chemin est gardé dans pilotes.json avec la version du navigateur,
+    et réutilisé tant que le fichier existe et que la version majeure n'a pas changé
+    """
+    with _pilotes_lock:
+        if navigateur in _pilotes:
+            return _pilotes[navigateur][0]
+        
+        try:
+            gestionnaire = _gestionnaire_pilote(navigateur)
+        except ImportError as e:
+            raise DependanceManquante(f"{e.name} n'est pas installé: lancez python main.py --setup") from e
+        try:
+            version = gestionnaire.driver.get_browser_version_from_os()
+        except Exception:
+            version = None
+        
+        memorise = _charger_pilotes().get(navigateur) or {}
+        chemin = memorise.get("chemin")
+        if chemin and os.path.exists(chemin) and \
+                (version is None or _version_majeure(version) == _version_majeure(memorise.get("version_navigateur"))):
+            _pilotes[navigateur] = (chemin, True)
+            return chemin
+        
+        chemin = gestionnaire.install()
+        pilotes = _charger_pilotes()
+        pilotes[navigateur] = {"chemin": chemin, "version_navigateur": version}
+        _sauver_pilotes(pilotes)
+        _pilotes[navigateur] = (chemin, False)
+        return chemin
+
+def oublier_pilote(navigateur):
+    """
+    Écarte un driver repris de pilotes.json qui n'a pas pu lancer le navigateur.
+    Retourne True s'il faut réessayer avec un driver fraîchement résolu.
+    """
+    with _pilotes_lock:
+        chemin, memorise = _pilotes.pop(navigateur, (None, False))
+        if not memorise:
+            return False
+        pilotes = _charger_pilotes()
+        pilotes.pop(navigateur, None)
+        _sauver_pilotes(pilotes)
+        return True
+
+def lancer_avec_pilote(navigateur, lancer):
+    """Lance le navigateur avec le driver mémorisé, puis avec un driver résolu à nouveau s'il est périmé"""
+    try:
+        return lancer(chemin_pilote(navigateur))
+    except DependanceManquante:
+        raise
+    except Exception:
+        if not oublier_pilote(navigateur):
+            raise
+        logger.info(f"Driver {navigateur} mémorisé inutilisable, nouvelle résolution")
+        return lancer(chemin_pilote(navigateur))
+
+# Profil de chargement des pages, surchargeable par la clé "navigateur" de config.json.
+# "leger": seuls le HTML et les scripts sont chargés (seul le texte est lu),
+# "complet": chargement normal de la page avec images, polices et traceurs
+PROFIL_NAVIGATEUR = {
+    'chargement': "leger",
+    'motifs_bloques': [
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm", "*.mp3",
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*facebook.net*", "*criteo.*", "*hotjar.com*", "*contentsquare.net*",
+    ],
+}
+
+def charger_profil_navigateur(config, chargement=None):
+    """Applique la section "navigateur" de config.json (et l'option --chargement)"""
+    PROFIL_NAVIGATEUR.update(config.get("navigateur", {}))
+    if chargement:
+        PROFIL_NAVIGATEUR['chargement'] = chargement
+
+def options_legeres(options):
+    """Options Chromium du profil léger (communes à Chrome et Edge)"""
+    # Rend la main dès le DOM prêt, sans attendre images, iframes et publicités
+    options.page_load_strategy = "eager"
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--mute-audio")
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+
+def bloquer_ressources(driver):
+    """Profil léger: le navigateur ne télécharge pas les ressources qui ne portent pas de texte"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": PROFIL_NAVIGATEUR['motifs_bloques']})
+    except Exception as e:
+        logger.error(f"Blocage des ressources impossible: {e}")
+    return driver
+
 def get_chrome_driver():
     """
     Lance Chrome de façon portable (Mac / Windows / Linux)
     Fallback automatique vers Edge sur Windows
     """
+    charger_selenium()
+    leger = PROFIL_NAVIGATEUR['chargement'] == "leger"
 
     # === OPTIONS COMMUNES ===
     options = Options()
@@ -178,17 +775,19 @@ def get_chrome_driver():
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    options.add_argument(f'user-agent={USER_AGENT}')
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option('useAutomationExtension', False)
+    if leger:
+        options_legeres(options)
 
     # === ESSAYER CHROME D'ABORD ===
     try:
         print("🔄 Tentative avec Chrome...")
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = lancer_avec_pilote(
+            "chrome", lambda chemin: webdriver.Chrome(service=Service(chemin), options=options))
         print("✅ Chrome lancé avec succès")
-        return driver
+        return bloquer_ressources(driver) if leger else driver
 
     except Exception as chrome_error:
         print(f"⚠️ Chrome non disponible: {str(chrome_error)[:50]}...")
@@ -208,13 +807,14 @@ def get_chrome_driver():
         edge_options.add_argument("--disable-blink-features=AutomationControlled")
         edge_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0')
         edge_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        if leger:
+            options_legeres(edge_options)
         
-        from webdriver_manager.microsoft import EdgeChromiumDriverManager
-        edge_service = EdgeService(EdgeChromiumDriverManager().install())
-        driver = webdriver.Edge(service=edge_service, options=edge_options)
+        driver = lancer_avec_pilote(
+            "edge", lambda chemin: webdriver.Edge(service=EdgeService(chemin), options=edge_options))
         
         print("✅ Edge lancé avec succès")
-        return driver
+        return bloquer_ressources(driver) if leger else driver
 
     except Exception as edge_error:
         logger.error(f"Erreur Edge: {edge_error}")
@@ -224,37 +824,132 @@ def get_chrome_driver():
             print("🔄 Dernière tentative: Chrome sans WebDriver Manager...")
             driver = webdriver.Chrome(options=options)
             print("✅ Chrome lancé sans WebDriver Manager")
-            return driver
+            return bloquer_ressources(driver) if leger else driver
         except Exception as final_error:
             logger.error(f"Erreur finale: {final_error}")
-            messagebox.showerror(
-                "Erreur navigateur",
+            raise NavigateurIndisponible(
                 "Aucun navigateur compatible trouvé.\n\n"
                 "Installez Google Chrome ou Microsoft Edge.\n"
                 "Ou vérifiez votre connexion internet (besoin de télécharger les drivers)."
             )
-            sys.exit(1)
+
+# ====================================
+# POOL DE NAVIGATEURS
+# ====================================
+class DriverPool:
+    """Garde jusqu'à N sessions Chrome ouvertes et les prête d'une recherche à l'autre"""
+    
+    def __init__(self, taille=1):
+        self.taille = taille
+        self._libres = deque()
+        self._nb_crees = 0
+        # Réveille les attentes quand une session est rendue ou qu'une place se libère
+        # (création échouée, session détruite)
+        self._condition = threading.Condition()
+        self._ferme = False
+    
+    def acquire(self, timeout=None):
+        """Emprunte une session vivante, en crée une si la limite le permet"""
+        echeance = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._condition:
+                while not self._libres and self._nb_crees >= self.taille:
+                    reste = echeance - time.monotonic() if echeance is not None else None
+                    if reste is not None and reste <= 0:
+                        raise queue.Empty
+                    self._condition.wait(reste)
+                driver = self._libres.popleft() if self._libres else None
+                if driver is None:
+                    self._nb_crees += 1
+            
+            if driver is None:
+                try:
+                    with METRIQUES.chrono("demarrage_navigateur"):
+                        return get_chrome_driver()
+                except:
+                    # La place est rendue: les threads en attente réessaient (ou échouent à leur tour)
+                    with self._condition:
+                        self._nb_crees -= 1
+                        self._condition.notify_all()
+                    raise
+            
+            if self._est_vivant(driver):
+                return driver
+            
+            # Session morte: on la remplace de façon transparente
+            logger.warning("Session navigateur morte, remplacement")
+            self._detruire(driver)
+    
+    def release(self, driver):
+        """Rend une session au pool"""
+        if self._ferme:
+            self._detruire(driver)
+        else:
+            with self._condition:
+                self._libres.append(driver)
+                self._condition.notify()
+    
+    @contextmanager
+    def session(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+    
+    def _est_vivant(self, driver):
+        try:
+            driver.current_url
+            return True
+        except:
+            return False
+    
+    def _detruire(self, driver):
+        with self._condition:
+            self._nb_crees -= 1
+            self._condition.notify()
+        try:
+            driver.quit()
+        except:
+            pass
+    
+    def close(self):
+        """Ferme toutes les sessions libres (les sessions prêtées seront fermées au retour)"""
+        self._ferme = True
+        while True:
+            with self._condition:
+                if not self._libres:
+                    break
+                driver = self._libres.popleft()
+            self._detruire(driver)
 
 # ====================================
 # ROBOTS.TXT PARSER
 # ====================================
 class RobotsChecker:
-    def __init__(self):
-        self.rp = urllib.robotparser.RobotFileParser()
+    """
+    Vérifie robots.txt avec un cache par domaine (TTL), partagé par toutes les
+    instances et persisté dans DATA_DIR pour survivre aux redémarrages
+    """
+    _politiques = {}  # netloc -> {"lignes": [...], "lu_le": timestamp}
+    _parsers = {}     # netloc -> RobotFileParser déjà analysé
+    _lock = threading.Lock()
+
+    def __init__(self, ttl=24 * 3600):
+        self.ttl = ttl
         self.crawl_delay = 2
 
     def check_robots(self, url):
         try:
             parsed = urlparse(url)
-            base_url = f"{parsed.scheme}://{parsed.netloc}"
-            robots_url = f"{base_url}/robots.txt"
-            
-            self.rp.set_url(robots_url)
-            self.rp.read()
-            allowed = self.rp.can_fetch("*", url)
+            with METRIQUES.chrono("robots"):
+                rp = self._politique(parsed.scheme, parsed.netloc)
+                allowed = rp.can_fetch("*", url)
+            if not allowed:
+                METRIQUES.incrementer("robots_refus_total")
             
             try:
-                delay = self.rp.crawl_delay("*")
+                delay = rp.crawl_delay("*")
                 if delay:
                     self.crawl_delay = delay
             except:
@@ -265,339 +960,2504 @@ class RobotsChecker:
             logger.error(f"Erreur robots.txt: {e}")
             return True
 
+    def _politique(self, scheme, netloc):
+        """Retourne le parser du domaine, en ne téléchargeant robots.txt qu'à expiration"""
+        with RobotsChecker._lock:
+            if not self._est_frais(netloc):
+                # Un autre processus a peut-être déjà rafraîchi le fichier
+                RobotsChecker._politiques.update(self._charger_disque())
+                RobotsChecker._parsers.pop(netloc, None)
+            
+            if not self._est_frais(netloc):
+                lignes = self._telecharger(f"{scheme}://{netloc}/robots.txt")
+                RobotsChecker._politiques[netloc] = {"lignes": lignes, "lu_le": time.time()}
+                RobotsChecker._parsers.pop(netloc, None)
+                self._sauver_disque()
+            
+            if netloc not in RobotsChecker._parsers:
+                rp = urllib.robotparser.RobotFileParser()
+                rp.parse(RobotsChecker._politiques[netloc]["lignes"])
+                RobotsChecker._parsers[netloc] = rp
+            return RobotsChecker._parsers[netloc]
+
+    def _est_frais(self, netloc):
+        entree = RobotsChecker._politiques.get(netloc)
+        return entree is not None and time.time() - entree["lu_le"] < self.ttl
+
+    def _telecharger(self, robots_url):
+        """Télécharge robots.txt (mêmes règles que RobotFileParser.read)"""
+        requete = urllib.request.Request(robots_url, headers={"User-Agent": USER_AGENT})
+        try:
+            with urllib.request.urlopen(requete, timeout=10) as reponse:
+                return reponse.read().decode("utf-8", errors="replace").splitlines()
+        except urllib.error.HTTPError as e:
+            if e.code in (401, 403):
+                return ["User-agent: *", "Disallow: /"]
+            if e.code < 500:
+                return []
+            raise
+
+    @staticmethod
+    def _charger_disque():
+        if os.path.exists(FICHIER_ROBOTS):
+            try:
+                with open(FICHIER_ROBOTS, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
+
+    @staticmethod
+    def _sauver_disque():
+        try:
+            temporaire = FICHIER_ROBOTS + ".tmp"
+            with open(temporaire, "w", encoding="utf-8") as f:
+                json.dump(RobotsChecker._politiques, f)
+            os.replace(temporaire, FICHIER_ROBOTS)
+        except Exception as e:
+            logger.error(f"Erreur cache robots.txt: {e}")
+
+# ====================================
+# LIMITEUR DE DÉBIT (POLITESSE)
+# ====================================
+class RateLimiter:
+    """
+    Seau à jetons par hôte, partagé par tous les threads: au plus `capacite`
+    requêtes en rafale, puis une requête toutes les `delai` secondes (Crawl-delay)
+    """
+    
+    def __init__(self, capacite=1):
+        self.capacite = capacite
+        self._seaux = {}  # hôte -> (jetons, dernier remplissage)
+        self._lock = threading.Lock()
+    
+    def attendre(self, url, delai):
+        """Bloque jusqu'à ce qu'une requête vers l'hôte de l'URL soit autorisée"""
+        hote = urlparse(url).netloc
+        while True:
+            with self._lock:
+                maintenant = time.monotonic()
+                jetons, dernier = self._seaux.get(hote, (self.capacite, maintenant))
+                if delai > 0:
+                    jetons = min(self.capacite, jetons + (maintenant - dernier) / delai)
+                else:
+                    jetons = self.capacite
+                
+                if jetons >= 1:
+                    self._seaux[hote] = (jetons - 1, maintenant)
+                    return
+                
+                self._seaux[hote] = (jetons, maintenant)
+                attente = (1 - jetons) * delai
+            time.sleep(attente)
+
+LIMITEUR = RateLimiter()
+
+# ====================================
+# SCORING
+# ====================================
+# Barème par défaut, surchargeable par la clé "scoring" de config.json
+BAREME_SCORE = {
+    'prix_seuils': [200, 300, 400, 500],        # prix < 200 -> 5 pts, < 300 -> 4 pts...
+    'prix_points': [5, 4, 3, 2, 1],
+    'note_seuils': [2, 3, 4, 4.5],              # note >= 4.5 -> 3 pts, >= 4 -> 2.5 pts...
+    'note_points': [0.5, 1, 2, 2.5, 3],         # (0 pt si pas de note)
+    'livraison_gratuite': ["gratuite", "free"],
+    'points_gratuite': 2,
+    'livraison_rapide': ["express", "24h"],
+    'points_rapide': 1,
+    'recommandation_seuils': [4, 6, 8],
+    'recommandations': ["⚠️ Offre peu attractive", "⚖️ Offre correcte",
+                        "👍 BONNE AFFAIRE", "🔥 EXCELLENTE AFFAIRE"],
+}
+
+def erreur_bareme(bareme):
+    """Description du premier défaut du barème (None s'il est utilisable)"""
+    for seuils, valeurs in (('prix_seuils', 'prix_points'), ('note_seuils', 'note_points'),
+                            ('recommandation_seuils', 'recommandations')):
+        if not isinstance(bareme[seuils], list) or not isinstance(bareme[valeurs], list):
+            return f"'{seuils}' et '{valeurs}' doivent être des listes"
+        if not all(isinstance(x, (int, float)) for x in bareme[seuils]) or bareme[seuils] != sorted(bareme[seuils]):
+            return f"'{seuils}' doit être une liste de nombres croissants"
+        if len(bareme[valeurs]) != len(bareme[seuils]) + 1:
+            return f"'{valeurs}' doit avoir une valeur de plus que '{seuils}'"
+    return None
+
+def charger_bareme(config):
+    """Applique la section "scoring" de config.json au barème par défaut (ignorée si incohérente)"""
+    scoring = config.get("scoring") or {}
+    bareme = {**BAREME_SCORE, **scoring} if isinstance(scoring, dict) else None
+    erreur = erreur_bareme(bareme) if bareme else "la section doit être un objet"
+    if erreur:
+        logger.error(f"Barème \"scoring\" de config.json ignoré: {erreur}")
+        return
+    BAREME_SCORE.update(scoring)
+
+def points_livraison(livraison, bareme):
+    livraison_lower = livraison.lower()
+    if any(mot in livraison_lower for mot in bareme['livraison_gratuite']):
+        return bareme['points_gratuite']
+    if any(mot in livraison_lower for mot in bareme['livraison_rapide']):
+        return bareme['points_rapide']
+    return 0
+
+def scorer(prix, note, livraison, bareme):
+    """
+    Score /10 et palier de recommandation d'une offre (recherche dichotomique dans les paliers).
+    Le palier est l'indice de son libellé dans bareme['recommandations'], dont le nombre
+    dépend de la configuration
+    """
+    score = bareme['prix_points'][bisect.bisect_right(bareme['prix_seuils'], prix)]
+    if note > 0:
+        score += bareme['note_points'][bisect.bisect_right(bareme['note_seuils'], note)]
+    score = round(score + points_livraison(livraison, bareme), 1)
+    return score, bisect.bisect_right(bareme['recommandation_seuils'], score)
+
+def scorer_produits(produits, bareme=None):
+    """
+    Score tout un lot de produits d'un coup: les libellés de livraison, très
+    répétitifs, ne sont analysés qu'une fois chacun
+    """
+    bareme = bareme or BAREME_SCORE
+    prix_seuils, prix_points = bareme['prix_seuils'], bareme['prix_points']
+    note_seuils, note_points = bareme['note_seuils'], bareme['note_points']
+    reco_seuils = bareme['recommandation_seuils']
+    livraisons = {}
+    
+    for p in produits:
+        if p.livraison not in livraisons:
+            livraisons[p.livraison] = points_livraison(p.livraison, bareme)
+        score = prix_points[bisect.bisect_right(prix_seuils, p.price)] + livraisons[p.livraison]
+        if p.note > 0:
+            score += note_points[bisect.bisect_right(note_seuils, p.note)]
+        p.score = round(score, 1)
+        p.tier = bisect.bisect_right(reco_seuils, p.score)
+    return produits
+
+TAILLE_LOT_SCORE = 256
+
+def top_k(produits, k=3, bareme=None):
+    """
+    Les k meilleurs scores (tas borné, sans trier toute la liste), rangs numérotés.
+    Un flux de produits est scoré par lots au fil de la lecture, sans être gardé en entier
+    """
+    def scores():
+        restants = iter(produits)
+        while lot := list(itertools.islice(restants, TAILLE_LOT_SCORE)):
+            yield from scorer_produits(lot, bareme)
+    
+    meilleurs = heapq.nlargest(k, scores(), key=lambda x: x.score)
+    for i, p in enumerate(meilleurs, 1):
+        p.rank = i
+    return meilleurs
+
 # ====================================
 # CLASSE PRODUIT
 # ====================================
+RE_ID_PRODUIT = re.compile(r'/f-\d+-([A-Za-z0-9]+)\.html', re.IGNORECASE)
+
+def extraire_id_produit(url):
+    """
+    Identifiant stable d'un produit à partir de son URL Cdiscount:
+    .../f-1440402-iph13128gominuit.html?idOffre=123 -> ('iph13128gominuit', '123')
+    """
+    if not url:
+        return None, None
+    parsed = urlparse(url)
+    match = RE_ID_PRODUIT.search(parsed.path)
+    produit_id = match.group(1).lower() if match else None
+    offre_id = parse_qs(parsed.query).get("idOffre", [None])[0]
+    return produit_id, offre_id
+
 class Product:
-    def __init__(self, title, price, note=0, livraison="Non spécifié", url=""):
+    # Représentation compacte: pas de __dict__ par instance, horodatage entier,
+    # libellés de livraison partagés et palier de recommandation en petit entier
+    __slots__ = ("title", "price", "note", "livraison", "url", "product_id", "offre_id",
+                 "disponible", "score", "rank", "tier", "scraped_at")
+    
+    def __init__(self, title, price, note=0, livraison="Non spécifié", url="", disponible=True):
         self.title = title
         self.price = price
         self.note = note
-        self.livraison = livraison
+        self.livraison = sys.intern(livraison)
         self.url = url
+        self.product_id, self.offre_id = extraire_id_produit(url)
+        self.disponible = disponible
         self.score = 0
         self.rank = 0
-        self.recommendation = ""
-        self.scraped_at = datetime.now().strftime("%d/%m/%Y %H:%M")
-        self.calculer_score()
-    
-    def calculer_score(self):
-        score = 0
-        
-        if self.price < 200:
-            score += 5
-        elif self.price < 300:
-            score += 4
-        elif self.price < 400:
-            score += 3
-        elif self.price < 500:
-            score += 2
-        else:
-            score += 1
-        
-        if self.note >= 4.5:
-            score += 3
-        elif self.note >= 4:
-            score += 2.5
-        elif self.note >= 3:
-            score += 2
-        elif self.note >= 2:
-            score += 1
-        elif self.note > 0:
-            score += 0.5
-        
-        livraison_lower = self.livraison.lower()
-        if "gratuite" in livraison_lower or "free" in livraison_lower:
-            score += 2
-        elif "express" in livraison_lower or "24h" in livraison_lower:
-            score += 1
-        
-        self.score = round(score, 1)
-        
-        if self.score >= 8:
-            self.recommendation = "🔥 EXCELLENTE AFFAIRE"
-        elif self.score >= 6:
-            self.recommendation = "👍 BONNE AFFAIRE"
-        elif self.score >= 4:
-            self.recommendation = "⚖️ Offre correcte"
-        else:
-            self.recommendation = "⚠️ Offre peu attractive"
-        
+        self.tier = 0  # indice du libellé dans BAREME_SCORE['recommandations']
+        self.scraped_at = int(time.time())
+        # Score attribué par lot (scorer_produits, top_k) plutôt qu'à chaque création
+    
+    @property
+    def recommendation(self):
+        return BAREME_SCORE['recommandations'][self.tier]
+    
+    @property
+    def date_affichage(self):
+        return datetime.fromtimestamp(self.scraped_at).strftime("%d/%m/%Y %H:%M")
+    
+    def to_dict(self):
+        """Représentation JSON (rapports du mode batch)"""
+        return {
+            'titre': self.title,
+            'prix': self.price,
+            'note': self.note,
+            'livraison': self.livraison,
+            'url': self.url,
+            'product_id': self.product_id,
+            'offre_id': self.offre_id,
+            'disponible': self.disponible,
+            'score': self.score,
+            'rang': self.rank,
+            'recommandation': self.recommendation,
+            'date': self.date_affichage,
+        }
+    
+    @property
+    def cle(self):
+        """Clé de déduplication et d'historique (le titre seulement si l'URL n'a pas de SKU)"""
+        return self.product_id or self.title
+    
+    def calculer_score(self, bareme=None):
+        self.score, self.tier = scorer(self.price, self.note, self.livraison, bareme or BAREME_SCORE)
         return self.score
 
 # ====================================
-# SCRAPER
+# BASE SQLITE
 # ====================================
-class CdiscountScraper:
-    def __init__(self):
-        self.robots = RobotsChecker()
-        self.products = []
-        
+class SQLiteStore:
+    """Base SQLite commune: une connexion par thread, mode WAL, transactions IMMEDIATE"""
+    
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._local = threading.local()
+    
+    def _connexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.chemin, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        """Transaction en écriture (verrou pris dès le début pour éviter les conflits)"""
+        conn = self._connexion()
+        conn.execute("BEGIN IMMEDIATE")
         try:
-            self.driver = get_chrome_driver()
-            self.wait = WebDriverWait(self.driver, 10)
-        except Exception as e:
-            logger.error(f"Erreur initialisation: {e}")
-            messagebox.showerror("Erreur", 
-                f"Impossible de démarrer Chrome.\n"
-                f"Vérifie que Google Chrome est installé!")
-            sys.exit(1)
+            yield conn
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
 
-    def search_products(self, query, max_pages=2):
-        self.products = []
-        titres_deja_vus = []
-        
-        url_base = f"https://www.cdiscount.com/search/10/{query}.html"
-        if not self.robots.check_robots(url_base):
-            return []
-        
-        try:
-            for page in range(1, max_pages + 1):
-                url = f"https://www.cdiscount.com/search/10/{query.replace(' ', '+')}.html?page={page}"
-                
-                self.driver.get(url)
-                self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                time.sleep(self.robots.crawl_delay)
-                
-                links = []
-                elements = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='/f-']")
-                for el in elements[:10]:
-                    href = el.get_attribute("href")
-                    if href and href not in links:
-                        links.append(href)
-                
-                for link in links:
-                    if len(self.products) >= 5:
-                        break
-                    
-                    time.sleep(self.robots.crawl_delay)
-                    product = self.analyze_product(link)
-                    
-                    if product and product.title not in titres_deja_vus:
-                        titres_deja_vus.append(product.title)
-                        self.products.append(product)
-                
-                if len(self.products) >= 5:
-                    break
-                    
-        except Exception as e:
-            logger.error(f"Erreur recherche: {e}")
-        
-        return self.products
+# ====================================
+# BACKEND HTTP (SANS NAVIGATEUR)
+# ====================================
+def extraire_prix(texte):
+    """Convertit un texte comme '1 299,99 €' en float (0 si aucun prix)"""
+    if not texte or not any(c.isdigit() for c in texte):
+        return 0
+    texte_propre = re.sub(r'[^\d,.]', '', texte)
+    texte_propre = texte_propre.replace(',', '.')
+    match = re.search(r'(\d+\.?\d*)', texte_propre)
+    if match:
+        return float(match.group(1))
+    return 0
 
-    def analyze_product(self, url):
+def lire_jsonld(blocs):
+    """Prix, note et disponibilité du premier objet schema.org Product trouvé dans les blocs JSON-LD"""
+    a_visiter = []
+    for bloc in blocs:
         try:
-            if not self.robots.check_robots(url):
-                return None
-            
-            self.driver.get(url)
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
-            
-            try:
-                titre = self.driver.find_element(By.TAG_NAME, "h1").text
-            except:
-                return None
-            
-            prix = 0
-            selecteurs_prix = ["span[itemprop='price']", ".price", ".prdtPrice", "span.sc-e4stwg-1"]
-            
-            for selecteur in selecteurs_prix:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selecteur)
-                    for el in elements:
-                        texte = el.text
-                        if texte and any(c.isdigit() for c in texte):
-                            texte_propre = re.sub(r'[^\d,.]', '', texte)
-                            texte_propre = texte_propre.replace(',', '.')
-                            match = re.search(r'(\d+\.?\d*)', texte_propre)
-                            if match:
-                                prix = float(match.group(1))
-                                break
-                    if prix > 0:
-                        break
-                except:
-                    continue
-            
-            if prix == 0:
-                return None
-            
-            note = 0
-            try:
-                note_elem = self.driver.find_element(By.CSS_SELECTOR, "span.ratingValue, .ac_rating")
-                note_text = note_elem.text.replace(',', '.')
-                note_match = re.search(r'(\d+\.?\d*)', note_text)
-                if note_match:
-                    note = float(note_match.group(1))
-            except:
-                pass
-            
-            livraison = "Standard"
-            try:
-                livraison_elem = self.driver.find_element(By.XPATH, "//*[contains(text(),'Livraison')]")
-                livraison = livraison_elem.text[:50]
-            except:
-                pass
+            a_visiter.append(json.loads(bloc))
+        except:
+            continue
+    
+    while a_visiter:
+        objet = a_visiter.pop(0)
+        if isinstance(objet, list):
+            a_visiter.extend(objet)
+            continue
+        if not isinstance(objet, dict):
+            continue
+        if "@graph" in objet:
+            a_visiter.extend(objet["@graph"])
+        types = objet.get("@type")
+        if types == "Product" or (isinstance(types, list) and "Product" in types):
+            offre = objet.get("offers") or {}
+            if isinstance(offre, list):
+                offre = offre[0] if offre else {}
+            return {
+                'prix': offre.get("price") or offre.get("lowPrice"),
+                'note': (objet.get("aggregateRating") or {}).get("ratingValue"),
+                'disponibilite': offre.get("availability"),
+            }
+    return {}
+
+def interpreter_champs(champs, url):
+    """
+    Transforme les champs bruts d'une fiche produit (lus dans le HTML ou dans le
+    navigateur) en Product: toutes les regex sont appliquées ici, une seule fois
+    """
+    titre = (champs.get('titre') or "").strip()
+    if not titre:
+        return None
+    
+    # Sélecteurs dans l'ordre où ils ont été essayés, jusqu'au premier qui donne un prix
+    durees = champs.get('durees') or {}
+    prix = 0
+    essais = []
+    for selecteur, textes in champs.get('prix') or []:
+        prix = next((p for p in map(extraire_prix, textes) if p > 0), 0)
+        essais.append((selecteur, prix > 0, durees.get(selecteur, 0)))
+        if prix > 0:
+            METRIQUES.incrementer("selecteur_prix_trouve_total", selecteur=selecteur)
+            break
+    
+    # Données structurées en secours quand aucun sélecteur ne donne de prix
+    donnees = lire_jsonld(champs.get('jsonld') or [])
+    if prix == 0:
+        prix = extraire_prix(str(donnees.get('prix') or ""))
+        if prix > 0:
+            METRIQUES.incrementer("selecteur_prix_trouve_total", selecteur="jsonld")
+    STATS_SELECTEURS.enregistrer(champs.get('contexte') or "produit", essais, prix > 0)
+    
+    if prix == 0:
+        return None
+    
+    note = 0
+    note_match = re.search(r'(\d+\.?\d*)', str(champs.get('note') or donnees.get('note') or "").replace(',', '.'))
+    if note_match:
+        note = float(note_match.group(1))
+    
+    livraison = (champs.get('livraison') or "")[:50] or "Standard"
+    disponibilite = champs.get('disponibilite') or donnees.get('disponibilite') or ""
+    
+    return Product(titre, prix, note, livraison, url, "OutOfStock" not in disponibilite)
+
+def champs_element(racine, contexte="produit"):
+    """Prix, note, livraison et disponibilité lus sous un élément (page entière ou tuile de résultat)"""
+    with METRIQUES.chrono("selecteur", selecteur=SELECTEUR_NOTE):
+        note_elem = racine.select_one(SELECTEUR_NOTE)
+    dispo_elem = racine.select_one("[itemprop='availability']")
+    
+    livraison = None
+    for texte in racine.find_all(string=re.compile("Livraison")):
+        if texte.parent and texte.parent.name not in ("script", "style"):
+            livraison = texte.parent.get_text(" ", strip=True)
+            break
+    
+    # itemprop='price' porte souvent la valeur dans l'attribut content.
+    # Les sélecteurs les plus fiables d'abord, arrêt au premier qui donne un prix
+    prix = []
+    durees = {}
+    for s in STATS_SELECTEURS.ordre(contexte):
+        debut = time.perf_counter()
+        with METRIQUES.chrono("selecteur", selecteur=s):
+            textes = [t for el in racine.select(s) for t in (el.get_text(" ", strip=True), el.get("content", ""))]
+        durees[s] = time.perf_counter() - debut
+        prix.append([s, textes])
+        if any(extraire_prix(t) > 0 for t in textes):
+            break
+    
+    return {
+        'contexte': contexte,
+        'prix': prix,
+        'durees': durees,
+        'note': note_elem.get_text() if note_elem else None,
+        'livraison': livraison,
+        'disponibilite': (dispo_elem.get("href") or dispo_elem.get("content")) if dispo_elem else None,
+    }
+
+def extraire_champs_html(html):
+    """Champs bruts d'une fiche produit à partir du HTML statique (mêmes sélecteurs que Selenium)"""
+    charger_http()
+    soup = BeautifulSoup(html, "html.parser")
+    
+    h1 = soup.find("h1")
+    champs = champs_element(soup)
+    champs['titre'] = h1.get_text(" ", strip=True) if h1 else None
+    champs['jsonld'] = [script.string or "" for script in soup.select("script[type='application/ld+json']")]
+    return champs
+
+def cle_lien(url):
+    """Identifiant produit d'un lien (SKU), ou le lien lui-même"""
+    return extraire_id_produit(url)[0] or url
+
+def extraire_tuiles_html(html, url):
+    """
+    Liens produits d'une page de résultats, chacun avec les champs lus sur sa tuile
+    (None si la tuile n'a pas pu être isolée). La tuile est le plus grand ancêtre
+    du lien qui ne contient aucun autre produit.
+    """
+    charger_http()
+    soup = BeautifulSoup(html, "html.parser")
+    with METRIQUES.chrono("selecteur", selecteur=SELECTEUR_LIENS):
+        elements = soup.select(SELECTEUR_LIENS)
+    
+    tuiles = {}
+    for el in elements:
+        lien = urljoin(url, el.get("href", ""))
+        if not lien or cle_lien(lien) in tuiles:
+            continue
+        
+        tuile = None
+        for parent in el.parents:
+            if parent.name in ("body", "html", "[document]"):
+                break
+            if any(cle_lien(urljoin(url, a.get("href", ""))) != cle_lien(lien)
+                   for a in parent.select(SELECTEUR_LIENS)):
+                break
+            tuile = parent
+        
+        champs = None
+        if tuile is not None:
+            titre = tuile.select_one("h2, h3, [class*='Tit'], [class*='title']")
+            image = tuile.find("img", alt=True)
+            champs = champs_element(tuile, "tuile")
+            if not champs['disponibilite'] and RE_EPUISE.search(tuile.get_text(" ")):
+                champs['disponibilite'] = "OutOfStock"
+            champs['titre'] = (titre.get_text(" ", strip=True) if titre else None) \
+                or el.get_text(" ", strip=True) or (image.get("alt") if image else None)
+        tuiles[cle_lien(lien)] = (lien, champs)
+    return list(tuiles.values())
+
+def tuile_suspecte(produit):
+    """
+    Vrai si le produit lu sur une tuile doit être confirmé par sa fiche:
+    champ manquant, titre tronqué ou prix invraisemblable
+    """
+    return produit is None or not produit.product_id or len(produit.title) < 8 \
+        or not (PRIX_PLAUSIBLES[0] <= produit.price <= PRIX_PLAUSIBLES[1])
+
+def extraire_produit_html(html, url):
+    """Analyse le HTML statique d'une fiche produit"""
+    return interpreter_champs(extraire_champs_html(html), url)
+
+# Même extraction que extraire_champs_html, exécutée dans la page en un seul aller-retour WebDriver
+JS_EXTRACTION = """
+const selecteursPrix = arguments[0], selecteurNote = arguments[1];
+const texte = el => (el.innerText || el.textContent || '').trim();
+const h1 = document.querySelector('h1');
+const durees = {};
+const chrono = (s, f) => {
+    const debut = performance.now();
+    try {
+        return f();
+    } finally {
+        durees[s] = (performance.now() - debut) / 1000;
+    }
+};
+// Sélecteurs déjà classés par fiabilité: arrêt au premier qui donne un nombre
+const prix = [];
+for (const s of selecteursPrix) {
+    const textes = chrono(s, () => {
+        try {
+            return Array.from(document.querySelectorAll(s)).flatMap(el => [texte(el), el.getAttribute('content') || '']);
+        } catch (e) {
+            return [];
+        }
+    });
+    prix.push([s, textes]);
+    if (textes.some(t => /[1-9]/.test(t))) break;
+}
+const note = chrono(selecteurNote, () => document.querySelector(selecteurNote));
+const livraison = document.evaluate("//*[contains(text(),'Livraison')]", document, null,
+                                    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const dispo = document.querySelector("[itemprop='availability']");
+return {
+    titre: h1 ? texte(h1) : null,
+    prix: prix,
+    note: note ? texte(note) : null,
+    livraison: livraison ? texte(livraison) : null,
+    disponibilite: dispo ? (dispo.getAttribute('href') || dispo.getAttribute('content')) : null,
+    jsonld: Array.from(document.querySelectorAll("script[type='application/ld+json']")).map(s => s.textContent),
+    durees: durees
+};
+"""
+
+# Même découpage en tuiles que extraire_tuiles_html, pour les pages de résultats rendues en JavaScript
+JS_TUILES = """
+const selecteurLiens = arguments[0], selecteursPrix = arguments[1], selecteurNote = arguments[2];
+const texte = el => (el.innerText || el.textContent || '').trim();
+const cle = href => { const m = /\\/f-\\d+-([A-Za-z0-9]+)\\.html/i.exec(href || ''); return m ? m[1].toLowerCase() : href; };
+const prixTuile = tuile => {
+    const prix = [];
+    for (const s of selecteursPrix) {
+        let textes = [];
+        try {
+            textes = Array.from(tuile.querySelectorAll(s)).flatMap(el => [texte(el), el.getAttribute('content') || '']);
+        } catch (e) {
+        }
+        prix.push([s, textes]);
+        if (textes.some(t => /[1-9]/.test(t))) break;
+    }
+    return prix;
+};
+const tuiles = new Map();
+for (const lien of document.querySelectorAll(selecteurLiens)) {
+    const id = cle(lien.href);
+    if (!lien.href || tuiles.has(id)) continue;
+    let tuile = null;
+    for (let p = lien.parentElement; p && p !== document.body; p = p.parentElement) {
+        if (Array.from(p.querySelectorAll(selecteurLiens)).some(a => cle(a.href) !== id)) break;
+        tuile = p;
+    }
+    let champs = null;
+    if (tuile) {
+        const titre = tuile.querySelector("h2, h3, [class*='Tit'], [class*='title']");
+        const image = tuile.querySelector('img[alt]');
+        const note = tuile.querySelector(selecteurNote);
+        const dispo = tuile.querySelector("[itemprop='availability']");
+        const livraison = Array.from(tuile.querySelectorAll('*')).find(
+            el => el.children.length === 0 && texte(el).includes('Livraison'));
+        champs = {
+            titre: (titre && texte(titre)) || texte(lien) || (image ? image.alt : null),
+            contexte: 'tuile',
+            prix: prixTuile(tuile),
+            note: note ? texte(note) : null,
+            livraison: livraison ? texte(livraison) : null,
+            disponibilite: dispo ? (dispo.getAttribute('href') || dispo.getAttribute('content'))
+                : (/épuisé|indisponible|rupture de stock/i.test(texte(tuile)) ? 'OutOfStock' : null)
+        };
+    }
+    tuiles.set(id, {lien: lien.href, champs: champs});
+}
+return Array.from(tuiles.values());
+"""
+
+class PageCache(SQLiteStore):
+    """
+    Cache disque des pages HTTP (DATA_DIR), indexé par URL. Garde le corps compressé
+    avec ETag / Last-Modified pour les requêtes conditionnelles, une durée de
+    fraîcheur par type de page et une taille maximale (éviction LRU).
+    """
+    
+    TTL_DEFAUT = {'recherche': 10 * 60, 'produit': 5 * 60, 'autre': 60 * 60}
+    
+    def __init__(self, chemin=None, taille_max=200 * 1024 * 1024, ttl=None):
+        super().__init__(chemin or FICHIER_CACHE)
+        self._connexion().executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                corps BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                recupere_le REAL NOT NULL,
+                consulte_le REAL NOT NULL,
+                taille INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_consulte ON pages (consulte_le);
+        """)
+        self.taille_max = taille_max
+        self.ttl = dict(self.TTL_DEFAUT, **(ttl or {}))
+    
+    @staticmethod
+    def type_page(url):
+        if "/search/" in url:
+            return "recherche"
+        if "/f-" in url:
+            return "produit"
+        return "autre"
+    
+    def lire(self, url):
+        """Entrée du cache {'corps', 'etag', 'last_modified', 'frais'} ou None"""
+        row = self._connexion().execute(
+            "SELECT type, corps, etag, last_modified, recupere_le FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        self._connexion().execute("UPDATE pages SET consulte_le = ? WHERE url = ?", (time.time(), url))
+        return {
+            'corps': zlib.decompress(row[1]).decode("utf-8"),
+            'etag': row[2],
+            'last_modified': row[3],
+            'frais': time.time() - row[4] < self.ttl.get(row[0], self.ttl['autre']),
+        }
+    
+    def est_frais(self, url):
+        row = self._connexion().execute(
+            "SELECT type, recupere_le FROM pages WHERE url = ?", (url,)).fetchone()
+        return row is not None and time.time() - row[1] < self.ttl.get(row[0], self.ttl['autre'])
+    
+    def ecrire(self, url, corps, etag=None, last_modified=None):
+        compresse = zlib.compress(corps.encode("utf-8"))
+        maintenant = time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, type, corps, etag, last_modified, recupere_le, "
+                "consulte_le, taille) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, self.type_page(url), compresse, etag, last_modified, maintenant, maintenant, len(compresse)))
+            self._evincer(conn)
+    
+    def revalide(self, url):
+        """Le serveur a répondu 304: la copie locale redevient fraîche"""
+        maintenant = time.time()
+        with self.transaction() as conn:
+            conn.execute("UPDATE pages SET recupere_le = ?, consulte_le = ? WHERE url = ?",
+                         (maintenant, maintenant, url))
+    
+    def _evincer(self, conn):
+        """Supprime les pages les moins récemment consultées au-delà de taille_max"""
+        total = conn.execute("SELECT COALESCE(SUM(taille), 0) FROM pages").fetchone()[0]
+        if total <= self.taille_max:
+            return
+        for url, taille in conn.execute("SELECT url, taille FROM pages ORDER BY consulte_le").fetchall():
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= taille
+            if total <= self.taille_max:
+                break
+
+class ArchivePages(SQLiteStore):
+    """
+    Archive optionnelle des pages brutes (DATA_DIR/archive_pages.db) pour pouvoir
+    ré-extraire l'historique quand les sélecteurs changent. Les corps sont compressés
+    et adressés par leur empreinte SHA-256: une page identique n'est stockée qu'une fois,
+    chaque récupération n'ajoute qu'une ligne d'index (URL, date, empreinte).
+    """
+    
+    def __init__(self, chemin=None):
+        super().__init__(chemin or FICHIER_ARCHIVE)
+        self._connexion().executescript("""
+            CREATE TABLE IF NOT EXISTS contenus (
+                empreinte TEXT PRIMARY KEY,
+                corps BLOB NOT NULL,
+                taille INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS releves (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                type TEXT NOT NULL,
+                empreinte TEXT NOT NULL,
+                recupere_le REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_releves_url ON releves (url, recupere_le);
+            CREATE INDEX IF NOT EXISTS idx_releves_date ON releves (recupere_le);
+        """)
+    
+    def archiver(self, url, corps, recupere_le=None):
+        brut = corps.encode("utf-8")
+        empreinte = hashlib.sha256(brut).hexdigest()
+        with self.transaction() as conn:
+            # Le corps n'est compressé qu'à sa première apparition
+            if conn.execute("SELECT 1 FROM contenus WHERE empreinte = ?", (empreinte,)).fetchone() is None:
+                compresse = zlib.compress(brut)
+                conn.execute("INSERT INTO contenus (empreinte, corps, taille) VALUES (?, ?, ?)",
+                             (empreinte, compresse, len(compresse)))
+                METRIQUES.incrementer("archive_contenus_total")
+            conn.execute("INSERT INTO releves (url, type, empreinte, recupere_le) VALUES (?, ?, ?, ?)",
+                         (url, PageCache.type_page(url), empreinte, recupere_le or time.time()))
+        return empreinte
+    
+    def corps(self, empreinte):
+        row = self._connexion().execute("SELECT corps FROM contenus WHERE empreinte = ?", (empreinte,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+    
+    def releves(self, type_page="produit", depuis=0):
+        """Index des récupérations: {empreinte: [(url, date), ...]} (chaque contenu une seule fois)"""
+        par_contenu = {}
+        for url, empreinte, recupere_le in self._connexion().execute(
+                "SELECT url, empreinte, recupere_le FROM releves WHERE type = ? AND recupere_le >= ? "
+                "ORDER BY recupere_le", (type_page, depuis)):
+            par_contenu.setdefault(empreinte, []).append((url, recupere_le))
+        return par_contenu
+
+class HttpFetcher:
+    """Récupère les pages en HTTP simple via une session requests mutualisée"""
+    
+    def __init__(self, timeout=10, pool_size=10, cache=None, archive=None):
+        """
+        cache : PageCache optionnel (revalidation conditionnelle ETag / Last-Modified)
+        archive : ArchivePages optionnelle qui garde chaque page récupérée
+        """
+        self.timeout = timeout
+        self.cache = cache
+        self.archive = archive
+        charger_http()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Language": "fr-FR,fr;q=0.9",
+        })
+    
+    def est_frais(self, url):
+        """Vrai si la page sera servie par le cache sans aucune requête"""
+        return self.cache is not None and self.cache.est_frais(url)
+    
+    def fetch(self, url):
+        """Retourne le HTML de la page, ou None en cas d'échec"""
+        try:
+            entree = self.cache.lire(url) if self.cache else None
+            if entree and entree['frais']:
+                METRIQUES.incrementer("pages_http_total", resultat="cache")
+                return entree['corps']
             
-            return Product(titre, prix, note, livraison, url)
+            entetes = {}
+            if entree and entree['etag']:
+                entetes["If-None-Match"] = entree['etag']
+            if entree and entree['last_modified']:
+                entetes["If-Modified-Since"] = entree['last_modified']
             
+            with METRIQUES.chrono("requete_http"):
+                reponse = self.session.get(url, timeout=self.timeout, headers=entetes)
+            METRIQUES.incrementer("pages_http_total", resultat=str(reponse.status_code))
+            if reponse.status_code == 304 and entree:
+                self.cache.revalide(url)
+                self._archiver(url, entree['corps'])
+                return entree['corps']
+            if reponse.status_code != 200:
+                logger.warning(f"HTTP {reponse.status_code} pour {url}")
+                return None
+            if self.cache:
+                self.cache.ecrire(url, reponse.text, reponse.headers.get("ETag"),
+                                  reponse.headers.get("Last-Modified"))
+            self._archiver(url, reponse.text)
+            return reponse.text
         except Exception as e:
-            logger.error(f"Erreur analyse produit: {e}")
+            logger.error(f"Erreur HTTP: {e}")
             return None
+    
+    def _archiver(self, url, corps):
+        """Une page vue sur le réseau (200 ou 304) entre dans l'archive"""
+        if self.archive:
+            try:
+                self.archive.archiver(url, corps)
+            except Exception as e:
+                logger.error(f"Erreur archive: {e}")
+    
+    def close(self):
+        self.session.close()
 
-    def get_top_3(self):
-        if not self.products:
+# ====================================
+# QUASI-DOUBLONS (MINHASH / LSH)
+# ====================================
+# Mots qui distinguent les variantes d'un même article (couleur, capacité) et mots vides
+MOTS_VARIANTES = {
+    "noir", "blanc", "bleu", "rouge", "vert", "gris", "rose", "jaune", "violet", "orange", "marron",
+    "beige", "argent", "argente", "or", "dore", "bronze", "cuivre", "platine", "titane", "graphite",
+    "anthracite", "minuit", "lumiere", "stellaire", "sideral", "creme", "lavande", "corail",
+    "turquoise", "bordeaux", "kaki", "ivoire", "fonce", "clair", "black", "white", "blue", "red",
+    "green", "grey", "gray", "pink", "silver", "gold", "purple",
+}
+MOTS_VIDES = {"de", "du", "des", "la", "le", "les", "et", "en", "pour", "avec", "un", "une", "au", "aux", "sur"}
+# Seule la capacité de stockage fait une variante: 8 kg, 1500 W ou 5000 mAh désignent un autre modèle
+RE_CAPACITE = re.compile(r"\b\d+(?:[.,]\d+)?\s?(?:go|gb|to|tb)\b")
+# La mémoire vive, elle, distingue deux configurations: "8 Go RAM" devient le code "ram8go"
+RE_MEMOIRE = re.compile(r"\b(?:(\d+)\s?(?:go|gb)\s*(?:de\s+)?ram|ram\s*:?\s*(\d+)\s?(?:go|gb))\b")
+RE_MOTS_TITRE = re.compile(r"[a-z0-9]+\+*")
+# Similarité (estimée sur les signatures) à partir de laquelle deux titres désignent le même article
+SEUIL_DOUBLON = 0.8
+NB_PERMUTATIONS = 64
+BANDES_LSH = 16  # 16 bandes de 4 valeurs: candidats dès ~50 % de mots communs, vérifiés ensuite
+P_MINHASH = (1 << 61) - 1
+_hasard = random.Random(20240229)
+PERMUTATIONS = [(_hasard.randrange(1, P_MINHASH), _hasard.randrange(P_MINHASH)) for _ in range(NB_PERMUTATIONS)]
+FICHIER_DOUBLONS = os.path.join(DATA_DIR, "doublons.db")
+
+def normaliser_titre(titre):
+    """
+    Mots significatifs d'un titre: minuscules sans accents, sans couleur, capacité de
+    stockage ni mots vides ("Apple iPhone 13 128 Go Minuit" -> {"apple", "iphone", "13"}).
+    Le "+" reste collé au mot: "Pro" et "Pro+" sont deux modèles
+    """
+    texte = unicodedata.normalize("NFKD", (titre or "").lower())
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    texte = RE_MEMOIRE.sub(lambda m: f" ram{m.group(1) or m.group(2)}go ", texte)
+    texte = RE_CAPACITE.sub(" ", texte)
+    return frozenset(m for m in RE_MOTS_TITRE.findall(texte)
+                     if m not in MOTS_VARIANTES and m not in MOTS_VIDES and (len(m) > 1 or m.isdigit()))
+
+def codes_modele(mots):
+    """Mots mêlant lettres et chiffres (a54, i5, wgg04409fr, ram8go): un seul qui diffère, autre produit"""
+    return frozenset(m for m in mots if any(c.isdigit() for c in m) and any(c.isalpha() for c in m))
+
+def empreinte_titre(titre):
+    """(signature MinHash, codes modèle) d'un titre, None s'il est trop court pour être comparé"""
+    mots = normaliser_titre(titre)
+    signature = signature_minhash(mots)
+    return (signature, codes_modele(mots)) if signature else None
+
+def signature_minhash(mots):
+    """Signature MinHash d'un ensemble de mots (None s'il est trop court pour être comparé)"""
+    if len(mots) < 2:
+        return None
+    valeurs = [zlib.crc32(m.encode()) for m in mots]
+    return tuple(min((a * v + b) % P_MINHASH for v in valeurs) for a, b in PERMUTATIONS)
+
+def similarite(sig_a, sig_b):
+    """Estimation de la similarité de Jaccard des deux ensembles de mots"""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NB_PERMUTATIONS
+
+def titre_lien(url):
+    """Titre approximatif tiré de l'URL: .../apple-iphone-13-128go-minuit/f-1440402-iph13.html"""
+    morceaux = urlparse(url).path.strip("/").split("/")
+    for i, morceau in enumerate(morceaux):
+        if RE_ID_PRODUIT.match("/" + morceau) and i > 0:
+            return morceaux[i - 1].replace("-", " ")
+    return None
+
+class IndexDoublons(SQLiteStore):
+    """
+    Titres et signatures MinHash des produits déjà rencontrés (DATA_DIR/doublons.db):
+    d'un lancement à l'autre, une tuile sans titre est reconnue par son SKU avant
+    même que sa fiche soit ouverte
+    """
+
+    def __init__(self, chemin=None):
+        super().__init__(chemin or FICHIER_DOUBLONS)
+        self._connexion().executescript("""
+            CREATE TABLE IF NOT EXISTS titres (
+                produit TEXT PRIMARY KEY,
+                titre TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                vu_le INTEGER NOT NULL
+            );
+        """)
+
+    def empreintes(self, cles):
+        """Empreinte (signature, codes modèle) connue de chaque clé produit demandée"""
+        cles = list(set(cles))
+        resultat = {}
+        conn = self._connexion()
+        for i in range(0, len(cles), 500):
+            lot = cles[i:i + 500]
+            requete = f"SELECT produit, titre, signature FROM titres WHERE produit IN ({','.join('?' * len(lot))})"
+            for produit, titre, signature in conn.execute(requete, lot):
+                resultat[produit] = (tuple(array.array("Q", signature)), codes_modele(normaliser_titre(titre)))
+        return resultat
+
+    def memoriser(self, produits):
+        """Titre et signature des produits analysés (ceux qui ont un SKU)"""
+        lignes = []
+        for p in produits:
+            signature = signature_minhash(normaliser_titre(p.title))
+            if p.product_id and signature:
+                lignes.append((p.product_id, p.title, array.array("Q", signature).tobytes(), p.scraped_at))
+        if lignes:
+            with self.transaction() as conn:
+                conn.executemany("INSERT OR REPLACE INTO titres (produit, titre, signature, vu_le) "
+                                 "VALUES (?, ?, ?, ?)", lignes)
+
+class DetecteurDoublons:
+    """
+    Quasi-doublons au sein d'une recherche (variantes de couleur ou de capacité,
+    copies de revendeurs): index LSH des produits retenus, consulté avant d'ouvrir
+    une fiche (titre de la tuile, titre déjà connu du SKU, sinon URL) puis sur le
+    titre de la fiche. Le premier produit dans l'ordre des résultats est gardé; ses
+    copies sont mises de côté et la première prend sa place si sa fiche ne donne rien.
+    """
+
+    def __init__(self, index=None, seuil=None):
+        self.index = index
+        self.seuil = seuil or SEUIL_DOUBLON
+        self._lignes = NB_PERMUTATIONS // BANDES_LSH
+        self._seaux = {}       # (bande, valeurs) -> [clés retenues]
+        self._empreintes = {}  # clé retenue -> [(signature, codes modèle)]
+        self._copies = {}      # clé retenue -> [(lien, champs, empreinte)] écartées en sa faveur
+
+    def filtrer(self, tuiles):
+        """Tuiles [(lien, champs), ...] sans les quasi-doublons d'un produit déjà retenu"""
+        connues = {}
+        if self.index:
+            try:
+                connues = self.index.empreintes(cle_lien(lien) for lien, _ in tuiles)
+            except Exception as e:
+                logger.error(f"Erreur index des doublons: {e}")
+
+        gardees = []
+        for lien, champs in tuiles:
+            cle = cle_lien(lien)
+            empreinte = empreinte_titre(champs.get('titre') if champs else None) \
+                or connues.get(cle) or empreinte_titre(titre_lien(lien))
+            original = self._original(cle, empreinte)
+            if original is not None:
+                METRIQUES.incrementer("doublons_total", etape="tuile")
+                self._copies.setdefault(original, []).append((lien, champs, empreinte))
+                continue
+            self._retenir(cle, empreinte)
+            gardees.append((lien, champs))
+        return gardees
+
+    def doublon(self, produit):
+        """Clé du produit retenu dont celui-ci est une copie (titre de la fiche), sinon None"""
+        cle = cle_lien(produit.url)
+        empreinte = empreinte_titre(produit.title)
+        original = self._original(cle, empreinte)
+        if original is not None:
+            METRIQUES.incrementer("doublons_total", etape="fiche")
+            # Ses copies écartées sont aussi celles de l'original
+            self._copies.setdefault(original, []).extend(self._copies.pop(cle, []))
+            self.oublier(produit.url)
+            return original
+        self._retenir(cle, empreinte)
+        return None
+
+    def oublier(self, lien):
+        """
+        Retire un produit non retenu (fiche vide, refusée ou copie) de l'index de la
+        recherche; retourne [(lien, champs)] de la copie qui le remplace, s'il en avait
+        """
+        cle = cle_lien(lien)
+        for signature, _ in self._empreintes.pop(cle, []):
+            for bande in self._bandes(signature):
+                seau = self._seaux.get(bande, [])
+                if cle in seau:
+                    seau.remove(cle)
+        
+        copies = self._copies.pop(cle, [])
+        if not copies:
             return []
+        (lien_copie, champs, empreinte), autres = copies[0], copies[1:]
+        self._retenir(cle_lien(lien_copie), empreinte)
+        if autres:
+            self._copies[cle_lien(lien_copie)] = autres
+        return [(lien_copie, champs)]
+
+    def _bandes(self, signature):
+        for i in range(BANDES_LSH):
+            yield i, signature[i * self._lignes:(i + 1) * self._lignes]
+
+    def _original(self, cle, empreinte):
+        if empreinte is None:
+            return None
+        signature, codes = empreinte
+        candidats = {c for bande in self._bandes(signature) for c in self._seaux.get(bande, ()) if c != cle}
+        for candidat in candidats:
+            # Codes modèle identiques d'abord: sur un titre long, un seul mot différent
+            # (A54 / A34, i5 / i7) laisse la similarité au-dessus du seuil
+            if any(c == codes and similarite(signature, s) >= self.seuil
+                   for s, c in self._empreintes[candidat]):
+                return candidat
+        return None
+
+    def _retenir(self, cle, empreinte):
+        if empreinte is None:
+            return
+        signature, _ = empreinte
+        self._empreintes.setdefault(cle, []).append(empreinte)
+        for bande in self._bandes(signature):
+            self._seaux.setdefault(bande, []).append(cle)
+
+# ====================================
+# SCRAPER
+# ====================================
+class CdiscountScraper:
+    MAX_PRODUITS = 5
+    URL_SITE = "https://www.cdiscount.com"
+    
+    def __init__(self, fetcher=None, backend="http", pool=None, workers=1, url_site=None,
+                 liste_seule=False, doublons=True):
+        """
+        backend="http" : requests + BeautifulSoup, Selenium seulement en repli
+        backend="selenium" : tout passe par le navigateur
+        pool : DriverPool partagé (sinon un pool privé d'une session par worker)
+        workers : nombre de fiches produit analysées en parallèle
+        url_site : racine du site interrogé (serveur local du benchmark par exemple)
+        liste_seule : produits lus sur les tuiles de résultats, fiche ouverte seulement
+                      si un champ manque ou semble faux (1 page au lieu de N+1)
+        doublons : écarte les quasi-doublons (variantes, copies de revendeurs) avant d'ouvrir leur fiche
+        """
+        self.liste_seule = liste_seule
+        self.doublons = get_index_doublons() if doublons and SEUIL_DOUBLON else None
+        self.url_site = (url_site or self.URL_SITE).rstrip("/")
+        self.robots = RobotsChecker()
+        self.products = []
+        self.archive = get_archive()
+        self.fetcher = None
+        if backend == "http":
+            self.fetcher = fetcher or HttpFetcher(cache=get_page_cache(), archive=self.archive)
+        self.workers = max(1, workers)
+        self._pool_prive = pool is None
+        self.pool = pool or DriverPool(taille=self.workers)
+
+    @contextmanager
+    def _navigateur(self):
+        """Emprunte une session Chrome au pool le temps d'une page"""
+        try:
+            charger_selenium()
+            driver = self.pool.acquire()
+        except NavigateurIndisponible:
+            raise
+        except DependanceManquante as e:
+            raise NavigateurIndisponible(str(e))
+        except Exception as e:
+            logger.error(f"Erreur initialisation: {e}")
+            raise NavigateurIndisponible(
+                f"Impossible de démarrer Chrome.\n"
+                f"Vérifie que Google Chrome est installé!")
+        try:
+            yield driver, WebDriverWait(driver, 10)
+        finally:
+            self.pool.release(driver)
+
+    def _attendre_tour(self, url):
+        """Politesse: attend un jeton du limiteur global pour l'hôte de l'URL"""
+        with METRIQUES.chrono("politesse"):
+            LIMITEUR.attendre(url, self.robots.crawl_delay)
+
+    def _fetch(self, url):
+        """Page via le backend HTTP: seules les vraies requêtes attendent leur tour"""
+        if not (hasattr(self.fetcher, "est_frais") and self.fetcher.est_frais(url)):
+            self._attendre_tour(url)
+        return self.fetcher.fetch(url)
+
+    def search_products(self, query, max_pages=2, rappel=None, annulation=None, max_produits=None):
+        """
+        Liste des produits d'une recherche (voir iter_products)
+        max_produits : nombre de produits analysés (MAX_PRODUITS par défaut)
+        rappel : fonction appelée avec chaque produit dès qu'il est analysé
+        annulation : threading.Event qui interrompt la recherche entre deux pages produit
+        """
+        self.products = []
+        try:
+            for product in self.iter_products(query, limit=max_produits or self.MAX_PRODUITS,
+                                              pages=max_pages, annulation=annulation):
+                self.products.append(product)
+                if rappel:
+                    rappel(product)
+        except NavigateurIndisponible:
+            raise
+        except Exception as e:
+            logger.error(f"Erreur recherche: {e}")
         
-        sorted_products = sorted(self.products, key=lambda x: x.score, reverse=True)
+        return self.products
+
+    def iter_products(self, query, limit=None, pages=None, annulation=None):
+        """
+        Génère les produits d'une recherche au fil de l'analyse, sans tout garder
+        en mémoire. limit / pages à None: jusqu'à la dernière page de résultats.
+        La page de résultats suivante est préchargée pendant l'analyse des produits
+        (sauf si la page courante suffit à atteindre `limit`), jamais plus de fiches
+        que de produits encore attendus ne sont en cours, et tout s'arrête dès que
+        l'appelant cesse de consommer le générateur.
+        """
+        url_base = f"{self.url_site}/search/10/{query}.html"
+        if not self.robots.check_robots(url_base):
+            return
         
-        for i, p in enumerate(sorted_products[:3], 1):
-            p.rank = i
+        cles_vues = set()
+        liens_vus = set()
+        detecteur = DetecteurDoublons(self.doublons) if self.doublons else None
+        a_memoriser = []
+        nb_produits = 0
+        page = 1
+        # Un thread de plus que de workers pour le préchargement des pages de résultats
+        executor = ThreadPoolExecutor(max_workers=self.workers + 1)
+        try:
+            page_suivante = executor.submit(self._liens_recherche, self._url_recherche(query, page))
+            while page_suivante is not None:
+                if annulation and annulation.is_set():
+                    return
+                
+                resultats, via_navigateur = page_suivante.result()
+                nouvelles = []
+                for link, champs in resultats:
+                    # Plusieurs offres d'un même SKU: une seule visite
+                    cle = cle_lien(link)
+                    if cle not in liens_vus:
+                        liens_vus.add(cle)
+                        nouvelles.append((link, champs))
+                if not nouvelles:
+                    return  # dernière page (ou page qui ne fait que se répéter)
+                # Variantes et copies d'un produit déjà retenu: fiche jamais ouverte
+                if detecteur:
+                    nouvelles = detecteur.filtrer(nouvelles)
+                tuiles = [(link, self._produit_tuile(link, champs)) for link, champs in nouvelles]
+                
+                page += 1
+                page_suivante = None
+                url_suivante = self._url_recherche(query, page) if pages is None or page <= pages else None
+                # Recherche lisible en HTTP: la page vide qui suit est la fin, pas un rendu JavaScript
+                if url_suivante and not (limit and nb_produits + len(tuiles) >= limit):
+                    page_suivante = executor.submit(self._liens_recherche, url_suivante, via_navigateur)
+                
+                restants = (lambda: limit - nb_produits) if limit else None
+                for link, product in self._analyser_en_flux(executor, tuiles, restants):
+                    if annulation and annulation.is_set():
+                        return
+                    if product is None and detecteur:
+                        # Fiche sans produit: une copie écartée reprend sa place dans la file
+                        tuiles.extend((l, self._produit_tuile(l, c)) for l, c in detecteur.oublier(link))
+                    if product and product.cle not in cles_vues:
+                        cles_vues.add(product.cle)
+                        # Tuile sans titre exploitable: le titre de la fiche peut encore trahir une copie
+                        if detecteur and detecteur.doublon(product) is not None:
+                            continue
+                        a_memoriser.append(product)
+                        nb_produits += 1
+                        yield product
+                        if limit and nb_produits >= limit:
+                            return
+                self._memoriser_titres(a_memoriser)
+                if url_suivante and page_suivante is None:
+                    # La page courante n'a pas suffi (fiches vides, doublons): la suivante est lue maintenant
+                    page_suivante = executor.submit(self._liens_recherche, url_suivante, via_navigateur)
+        finally:
+            # Les analyses en attente sont abandonnées, seules celles en cours se terminent
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._memoriser_titres(a_memoriser)
+
+    def _memoriser_titres(self, produits):
+        """Titres des produits retenus, reconnus par leur SKU aux prochaines recherches"""
+        if produits and self.doublons:
+            try:
+                self.doublons.memoriser(produits)
+            except Exception as e:
+                logger.error(f"Erreur index des doublons: {e}")
+            produits.clear()
+
+    def _produit_tuile(self, link, champs):
+        """Mode liste: produit lu sur la tuile, ou None s'il faut ouvrir la fiche"""
+        if not self.liste_seule or not champs:
+            return None
+        produit = interpreter_champs(champs, link)
+        if tuile_suspecte(produit):
+            METRIQUES.incrementer("tuiles_total", resultat="fiche")
+            return None
+        METRIQUES.incrementer("tuiles_total", resultat="liste")
+        return produit
+
+    def _analyser_en_flux(self, executor, tuiles, restants=None):
+        """
+        (lien, produit ou None) des tuiles dans l'ordre, avec au plus `workers` fiches
+        en cours à la fois (une tuile déjà lue en mode liste ne coûte aucune page).
+        `tuiles` peut s'allonger pendant le parcours (copie qui remplace une fiche vide).
+        restants : fonction qui donne le nombre de produits encore attendus; les fiches
+        en cours (y compris celle pas encore rendue) ne le dépassent jamais
+        """
+        def analyser(tuile):
+            link, produit = tuile
+            if produit is not None:
+                deja_lu = Future()
+                deja_lu.set_result(produit)
+                return link, deja_lu
+            return link, executor.submit(self.analyze_product, link)
+        
+        def place_libre(en_main):
+            plafond = self.workers if restants is None else min(self.workers, restants() - en_main)
+            return suivante < len(tuiles) and len(en_cours) < plafond
+        
+        suivante = 0
+        en_cours = deque()
+        while True:
+            while place_libre(0):
+                en_cours.append(analyser(tuiles[suivante]))
+                suivante += 1
+            if not en_cours:
+                return
+            link, future = en_cours.popleft()
+            product = future.result()
+            # La fiche suivante démarre avant de rendre celle-ci, si un produit manque encore
+            if place_libre(1):
+                en_cours.append(analyser(tuiles[suivante]))
+                suivante += 1
+            yield link, product
+
+    def _url_recherche(self, query, page):
+        return f"{self.url_site}/search/10/{query.replace(' ', '+')}.html?page={page}"
+
+    def _liens_recherche(self, url, repli=True):
+        """
+        Liens produits d'une page de résultats (HTTP d'abord, Selenium en repli),
+        chacun avec les champs de sa tuile: ([(lien, champs ou None), ...], via_navigateur)
+        repli=False : une page HTTP sans résultat est la fin de la recherche
+        """
+        if self.fetcher:
+            html = self._fetch(url)
+            if html:
+                tuiles = extraire_tuiles_html(html, url)
+                if tuiles or not repli:
+                    return tuiles, False
+        
+        self._attendre_tour(url)
+        with self._navigateur() as (driver, wait):
+            with METRIQUES.chrono("driver_get", page="recherche"):
+                driver.get(url)
+            self._attendre_element(wait, SELECTEUR_LIENS, "recherche")
             
-        return sorted_products[:3]
+            with METRIQUES.chrono("selecteur", selecteur=SELECTEUR_LIENS):
+                tuiles = driver.execute_script(JS_TUILES, SELECTEUR_LIENS, STATS_SELECTEURS.ordre("tuile"), SELECTEUR_NOTE) or []
+        return [(t['lien'], t['champs']) for t in tuiles if t.get('lien')], True
 
-    def close(self):
+    def analyze_product(self, url):
         try:
-            self.driver.quit()
-        except:
+            if not self.robots.check_robots(url):
+                return None
+            
+            if self.fetcher:
+                html = self._fetch(url)
+                if html:
+                    product = extraire_produit_html(html, url)
+                    if product:
+                        return product
+            
+            self._attendre_tour(url)
+            with self._navigateur() as (driver, wait):
+                return self._analyze_selenium(driver, wait, url)
+            
+        except NavigateurIndisponible:
+            raise
+        except Exception as e:
+            logger.error(f"Erreur analyse produit: {e}")
+            return None
+
+    def _attendre_element(self, wait, selecteur, page):
+        """
+        Attend l'élément utile de la page (lien produit, prix) plutôt que body/h1:
+        avec le chargement "eager" le reste de la page peut encore arriver
+        """
+        try:
+            with METRIQUES.chrono("attente_element", page=page):
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selecteur)))
+        except Exception:
+            # Page sans l'élément (plus de résultats, produit sans prix): on lit ce qui est là
             pass
 
+    def _analyze_selenium(self, driver, wait, url):
+        """Analyse une fiche produit avec le navigateur (pages rendues en JavaScript)"""
+        with METRIQUES.chrono("driver_get", page="produit"):
+            driver.get(url)
+        self._attendre_element(wait, SELECTEUR_ATTENTE_PRIX, "produit")
+        
+        # Tous les champs en un seul execute_script au lieu d'un appel WebDriver par sélecteur
+        with METRIQUES.chrono("extraction_js"):
+            champs = driver.execute_script(JS_EXTRACTION, STATS_SELECTEURS.ordre("produit"), SELECTEUR_NOTE) or {}
+        # Durées de chaque sélecteur mesurées dans la page
+        for selecteur, duree in (champs.get('durees') or {}).items():
+            METRIQUES.observer("duree_secondes", duree, etape="selecteur", selecteur=selecteur)
+        produit = interpreter_champs(champs, url)
+        if self.archive:
+            # Page rendue par le navigateur: gardée telle quelle pour une future ré-extraction
+            try:
+                self.archive.archiver(url, driver.page_source)
+            except Exception as e:
+                logger.error(f"Erreur archive: {e}")
+        return produit
+
+    def get_top(self, k=3):
+        return top_k(self.products, k)
+
+    def get_top_3(self):
+        return self.get_top(3)
+
+    def close(self):
+        """Ferme le pool s'il est privé (un pool partagé reste au chaud)"""
+        if self._pool_prive:
+            self.pool.close()
+        if self.fetcher:
+            self.fetcher.close()
+
 # ====================================
-# FONCTIONS DE GESTION (avec alertes mail)
+# HISTORIQUE DES PRIX (SQLITE)
 # ====================================
-def sauvegarder_historique(produits):
-    """Sauvegarde et détecte les baisses de prix"""
-    try:
-        historique = {}
-        
-        # Charger l'historique existant
-        if os.path.exists(FICHIER_HISTO):
+class PriceStore(SQLiteStore):
+    """
+    Historique append-only des observations de prix (SQLite en mode WAL):
+    plusieurs processus peuvent écrire en même temps sans réécrire le fichier
+    """
+    
+    def __init__(self, chemin=None):
+        super().__init__(chemin or FICHIER_DB)
+        conn = self._connexion()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS observations (
+                produit TEXT NOT NULL,
+                titre TEXT,
+                prix REAL NOT NULL,
+                url TEXT,
+                horodatage INTEGER NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_observations_produit_date
+                ON observations (produit, horodatage);
+            CREATE TABLE IF NOT EXISTS meta (
+                cle TEXT PRIMARY KEY,
+                valeur TEXT
+            );
+            CREATE TABLE IF NOT EXISTS agregats (
+                produit TEXT PRIMARY KEY,
+                etat TEXT NOT NULL
+            );
+        """)
+        self._importer_csv()
+    
+    def ajouter(self, produits, horodatage=None, conn=None):
+        """Ajoute une observation par produit, en une seule transaction (ou dans `conn`)"""
+        horodatage = int(horodatage or time.time())
+        lignes = [(p.cle, p.title, p.price, p.url, horodatage) for p in produits]
+        if conn is None:
+            with self.transaction() as conn:
+                self._inserer(conn, lignes)
+        else:
+            self._inserer(conn, lignes)
+    
+    @staticmethod
+    def _inserer(conn, lignes):
+        # Deux relevés dans la même seconde: le plus récent l'emporte
+        conn.executemany(
+            "INSERT OR REPLACE INTO observations (produit, titre, prix, url, horodatage) "
+            "VALUES (?, ?, ?, ?, ?)", lignes)
+    
+    def completer(self, lignes, fenetre=600):
+        """
+        Rapproche des observations passées [(produit, titre, prix, url, horodatage), ...]
+        (date de récupération de la page) de l'historique. Le relevé en direct de la même
+        page est daté un peu plus tard: une observation du produit à moins de `fenetre`
+        secondes est corrigée si le prix diffère, sinon la ligne est ajoutée.
+        Retourne (lignes ajoutées, observations corrigées)
+        """
+        ajoutees = corrigees = 0
+        with self.transaction() as conn:
+            for produit, titre, prix, url, horodatage in lignes:
+                existante = conn.execute(
+                    "SELECT rowid, prix FROM observations WHERE produit = ? AND horodatage BETWEEN ? AND ? "
+                    "ORDER BY ABS(horodatage - ?) LIMIT 1",
+                    (produit, horodatage - fenetre, horodatage + fenetre, horodatage)).fetchone()
+                if existante is None:
+                    conn.execute("INSERT INTO observations (produit, titre, prix, url, horodatage) "
+                                 "VALUES (?, ?, ?, ?, ?)", (produit, titre, prix, url, horodatage))
+                    ajoutees += 1
+                elif existante[1] != prix:
+                    conn.execute("UPDATE observations SET prix = ?, titre = ? WHERE rowid = ?",
+                                 (prix, titre, existante[0]))
+                    corrigees += 1
+        return ajoutees, corrigees
+    
+    def oublier_agregats(self, cles):
+        """Les agrégats de ces produits seront recalculés depuis l'historique au prochain relevé"""
+        cles = list(set(cles))
+        with self.transaction() as conn:
+            for i in range(0, len(cles), 500):
+                lot = cles[i:i + 500]
+                conn.execute(f"DELETE FROM agregats WHERE produit IN ({','.join('?' * len(lot))})", lot)
+    
+    def charger_agregats(self, conn, cles):
+        """Agrégats glissants des produits demandés (absents si jamais calculés)"""
+        cles = list(set(cles))
+        agregats = {}
+        for i in range(0, len(cles), 500):
+            lot = cles[i:i + 500]
+            requete = f"SELECT produit, etat FROM agregats WHERE produit IN ({','.join('?' * len(lot))})"
+            for produit, etat in conn.execute(requete, lot):
+                agregats[produit] = AgregatsProduit.depuis_json(etat)
+        return agregats
+    
+    def sauver_agregats(self, conn, agregats):
+        conn.executemany("INSERT OR REPLACE INTO agregats (produit, etat) VALUES (?, ?)",
+                         [(cle, a.vers_json()) for cle, a in agregats.items()])
+    
+    def historique(self, cle, depuis=0):
+        """Liste (horodatage, prix) d'un produit, du plus ancien au plus récent"""
+        return self._connexion().execute(
+            "SELECT horodatage, prix FROM observations WHERE produit = ? AND horodatage >= ? "
+            "ORDER BY horodatage", (cle, depuis)).fetchall()
+    
+    def _importer_csv(self):
+        """Importe une seule fois l'ancien historique_prix.csv"""
+        if not os.path.exists(FICHIER_HISTO):
+            return
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE cle = 'import_csv'").fetchone():
+                return
+            lignes = []
             with open(FICHIER_HISTO, "r", encoding="utf-8") as f:
                 reader = csv.reader(f)
                 next(reader, None)  # Skip header
                 for row in reader:
-                    if len(row) >= 2:
+                    if len(row) >= 3:
                         try:
-                            historique[row[0]] = float(row[1])
+                            date = datetime.strptime(row[2], "%d/%m/%Y %H:%M")
+                            lignes.append((row[0], row[0], float(row[1]), "", int(date.timestamp())))
                         except:
                             pass
-        
-        # Détecter les baisses de prix
+            conn.executemany(
+                "INSERT OR IGNORE INTO observations (produit, titre, prix, url, horodatage) "
+                "VALUES (?, ?, ?, ?, ?)", lignes)
+            conn.execute("INSERT INTO meta (cle, valeur) VALUES ('import_csv', ?)", (str(len(lignes)),))
+            logger.info(f"{len(lignes)} prix importés depuis {FICHIER_HISTO}")
+
+_price_store = None
+_singletons_lock = threading.Lock()
+
+_page_cache = None
+_archive = None
+ARCHIVE_ACTIVE = False
+_index_doublons = None
+
+def get_page_cache():
+    """Cache de pages partagé par les scrapers (ouvert au premier usage)"""
+    global _page_cache
+    with _singletons_lock:
+        if _page_cache is None:
+            _page_cache = PageCache()
+        return _page_cache
+
+def get_archive():
+    """Archive des pages si elle est activée (--archiver ou "archive_pages" dans config.json), sinon None"""
+    global _archive
+    with _singletons_lock:
+        if _archive is None and ARCHIVE_ACTIVE:
+            _archive = ArchivePages()
+        return _archive
+
+def get_index_doublons():
+    """Titres des produits déjà rencontrés, pour la détection des quasi-doublons"""
+    global _index_doublons
+    with _singletons_lock:
+        if _index_doublons is None:
+            _index_doublons = IndexDoublons()
+        return _index_doublons
+
+def charger_doublons(config):
+    """Seuil de similarité des quasi-doublons ("seuil_doublons" dans config.json, 0 pour désactiver)"""
+    global SEUIL_DOUBLON
+    try:
+        SEUIL_DOUBLON = float(config.get("seuil_doublons", SEUIL_DOUBLON))
+    except (TypeError, ValueError):
+        logger.error(f"seuil_doublons invalide: {config.get('seuil_doublons')}")
+
+def charger_archive(config, activer=False):
+    """Active l'archive des pages pour ce processus"""
+    global ARCHIVE_ACTIVE
+    ARCHIVE_ACTIVE = bool(activer or config.get("archive_pages"))
+
+def get_price_store():
+    """Historique partagé par toute l'application (ouvert au premier usage)"""
+    global _price_store
+    with _singletons_lock:
+        if _price_store is None:
+            _price_store = PriceStore()
+        return _price_store
+
+# ====================================
+# MOTEUR DE RÈGLES D'ALERTE
+# ====================================
+class AgregatsProduit:
+    """
+    Agrégats glissants d'un produit, mis à jour à chaque relevé sans relire
+    l'historique. `minimums` est une file monotone (horodatage, prix) à prix
+    croissants: le minimum depuis t est le premier élément d'horodatage >= t.
+    """
+    __slots__ = ("dernier_prix", "dernier_horodatage", "disponible", "nb_releves", "minimums")
+    
+    def __init__(self):
+        self.dernier_prix = None
+        self.dernier_horodatage = 0
+        self.disponible = True
+        self.nb_releves = 0
+        self.minimums = deque()
+    
+    def minimum_depuis(self, depuis):
+        """Prix minimum relevé depuis `depuis` (None si aucun relevé)"""
+        i = bisect.bisect_left(self.minimums, (depuis,))
+        return self.minimums[i][1] if i < len(self.minimums) else None
+    
+    def ajouter(self, horodatage, prix, disponible=True, fenetre=90 * 86400):
+        while self.minimums and self.minimums[-1][1] >= prix:
+            self.minimums.pop()
+        self.minimums.append((horodatage, prix))
+        while self.minimums[0][0] < horodatage - fenetre:
+            self.minimums.popleft()
+        self.dernier_prix = prix
+        self.dernier_horodatage = horodatage
+        self.disponible = disponible
+        self.nb_releves += 1
+    
+    def vers_json(self):
+        return json.dumps([self.dernier_prix, self.dernier_horodatage, self.disponible,
+                           self.nb_releves, list(self.minimums)])
+    
+    @classmethod
+    def depuis_json(cls, texte):
+        agregat = cls()
+        (agregat.dernier_prix, agregat.dernier_horodatage, agregat.disponible,
+         agregat.nb_releves, minimums) = json.loads(texte)
+        agregat.minimums = deque(tuple(m) for m in minimums)
+        return agregat
+
+class RegleBaisse:
+    """Baisse par rapport au dernier relevé, d'au moins `pourcentage` % et `montant` €"""
+    nom = "baisse"
+    
+    def __init__(self, pourcentage=0, montant=0):
+        self.pourcentage = pourcentage
+        self.montant = montant
+    
+    def verifier(self, agregat, prix, horodatage, disponible, prix_cible):
+        ancien = agregat.dernier_prix
+        if not ancien or prix >= ancien:
+            return None
+        if ancien - prix < self.montant or (ancien - prix) / ancien * 100 < self.pourcentage:
+            return None
+        return f"Baisse de {ancien - prix:.2f}€ (-{(ancien - prix) / ancien * 100:.1f}%)"
+
+class ReglePlusBas:
+    """Nouveau prix le plus bas sur les `jours` derniers jours"""
+    nom = "plus_bas"
+    
+    def __init__(self, jours=30):
+        self.jours = jours
+    
+    def verifier(self, agregat, prix, horodatage, disponible, prix_cible):
+        minimum = agregat.minimum_depuis(horodatage - self.jours * 86400)
+        if minimum is not None and prix < minimum:
+            return f"Prix le plus bas sur {self.jours} jours"
+        return None
+
+class RegleSousCible:
+    """Le prix passe sous le prix cible (une seule alerte au franchissement)"""
+    nom = "sous_cible"
+    
+    def __init__(self, prix_cible=None):
+        self.prix_cible = prix_cible
+    
+    def verifier(self, agregat, prix, horodatage, disponible, prix_cible):
+        cible = prix_cible or self.prix_cible
+        if not cible or prix > cible:
+            return None
+        if agregat.dernier_prix is not None and agregat.dernier_prix <= cible:
+            return None
+        return f"Sous le prix cible de {cible:.2f}€"
+
+class RegleRetourStock:
+    """Le produit redevient disponible"""
+    nom = "retour_stock"
+    
+    def verifier(self, agregat, prix, horodatage, disponible, prix_cible):
+        if disponible and agregat.nb_releves and not agregat.disponible:
+            return "De nouveau en stock"
+        return None
+
+TYPES_REGLES = {cls.nom: cls for cls in (RegleBaisse, ReglePlusBas, RegleSousCible, RegleRetourStock)}
+
+class MoteurRegles:
+    """
+    Évalue toutes les règles d'un produit sur ses agrégats, puis met les agrégats
+    à jour avec le nouveau relevé: coût constant par produit et par relevé
+    """
+    
+    def __init__(self, regles=None, fenetre_jours=90):
+        if regles is None:
+            regles = self.regles_depuis_config(EmailConfig.load())
+        self.regles = regles
+        self.fenetre = fenetre_jours * 86400
+    
+    @staticmethod
+    def regles_depuis_config(config):
+        """
+        Règles de config.json, par ex.
+        "regles": [{"type": "baisse", "pourcentage": 5}, {"type": "plus_bas", "jours": 30}]
+        """
+        regles = []
+        for definition in config.get("regles", []):
+            params = dict(definition)
+            type_regle = TYPES_REGLES.get(params.pop("type", None))
+            if type_regle:
+                regles.append(type_regle(**params))
+        return regles or [RegleBaisse(), RegleSousCible(), RegleRetourStock()]
+    
+    def evaluer(self, agregat, produit, horodatage, prix_cible=None):
+        """Alertes déclenchées par le relevé, puis mise à jour incrémentale des agrégats"""
+        disponible = getattr(produit, "disponible", True)
         alertes = []
-        for p in produits:
-            if p.title in historique and p.price < historique[p.title]:
+        for regle in self.regles:
+            message = regle.verifier(agregat, produit.price, horodatage, disponible, prix_cible)
+            if message:
                 alertes.append({
-                    'titre': p.title,
-                    'ancien_prix': historique[p.title],
-                    'nouveau_prix': p.price,
-                    'url': p.url
+                    'titre': produit.title,
+                    'ancien_prix': agregat.dernier_prix or produit.price,
+                    'nouveau_prix': produit.price,
+                    'url': produit.url,
+                    'regle': regle.nom,
+                    'message': message,
                 })
+        agregat.ajouter(horodatage, produit.price, disponible, self.fenetre)
+        return alertes
+    
+    def amorcer(self, store, produit):
+        """
+        Agrégats d'un produit encore jamais évalué: calculés une seule fois depuis
+        l'historique existant (y compris les lignes de l'ancien CSV, indexées par titre)
+        """
+        agregat = AgregatsProduit()
+        depuis = int(time.time()) - self.fenetre
+        historique = store.historique(produit.cle, depuis) or store.historique(produit.title, depuis)
+        for horodatage, prix in historique:
+            agregat.ajouter(horodatage, prix, True, self.fenetre)
+        return agregat
+
+# ====================================
+# FONCTIONS DE GESTION (avec alertes mail)
+# ====================================
+def sauvegarder_historique(produits, store=None, moteur=None, cibles=None):
+    """
+    Sauvegarde les prix et évalue les règles d'alerte sur les agrégats glissants.
+    cibles : {cle produit: prix cible} optionnel (watchlist)
+    """
+    try:
+        store = store or get_price_store()
+        moteur = moteur or MoteurRegles()
+        cibles = cibles or {}
+        maintenant = int(time.time())
+        alertes = []
         
-        # Sauvegarder les nouveaux prix
-        with open(FICHIER_HISTO, "w", encoding="utf-8", newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Produit", "Prix", "Date"])
+        # Lecture des agrégats, évaluation et écriture dans la même transaction:
+        # deux processus qui relèvent le même produit ne perdent aucune mise à jour
+        with METRIQUES.chrono("historique"), store.transaction() as conn:
+            agregats = store.charger_agregats(conn, [p.cle for p in produits])
             for p in produits:
-                writer.writerow([p.title, p.price, p.scraped_at])
+                if p.cle not in agregats:
+                    agregats[p.cle] = moteur.amorcer(store, p)
+                alertes.extend(moteur.evaluer(agregats[p.cle], p, maintenant, cibles.get(p.cle)))
+            
+            store.sauver_agregats(conn, {p.cle: agregats[p.cle] for p in produits})
+            store.ajouter(produits, maintenant, conn=conn)
         
+        for a in alertes:
+            METRIQUES.incrementer("alertes_total", regle=a.get('regle', ""))
         return alertes
         
     except Exception as e:
         logger.error(f"Erreur historique: {e}")
         return []
 
+def email_configure(config_email):
+    """Vrai si l'expéditeur et le destinataire des alertes sont renseignés"""
+    return bool(config_email) and bool(config_email.get('email_expediteur')) \
+        and bool(config_email.get('email_destinataire'))
+
+def construire_message(alertes, config_email):
+    """Construit l'email HTML récapitulant les alertes"""
+    expediteur = config_email.get('email_expediteur')
+    destinataire = config_email.get('email_destinataire')
+    
+    # Créer le message
+    msg = MIMEMultipart()
+    msg['Subject'] = f"🔔 ALERTE PRIX CDISCOUNT - {len(alertes)} alerte(s) détectée(s) !"
+    msg['From'] = expediteur
+    msg['To'] = destinataire
+    
+    # Corps du message en HTML
+    corps = """
+    <html>
+    <head>
+        <style>
+            body { font-family: Arial, sans-serif; }
+            .alerte { border: 1px solid #ccc; padding: 15px; margin: 10px 0; border-radius: 5px; }
+            .titre { font-size: 16px; font-weight: bold; color: #333; }
+            .prix { font-size: 14px; }
+            .ancien { color: red; text-decoration: line-through; }
+            .nouveau { color: green; font-weight: bold; font-size: 18px; }
+            .economie { color: #CC0000; font-weight: bold; }
+            .lien { background-color: #CC0000; color: white; padding: 5px 10px; 
+                    text-decoration: none; border-radius: 3px; display: inline-block; }
+        </style>
+    </head>
+    <body>
+        <h2>🛍️ Alertes de prix sur Cdiscount</h2>
+    """
+    
+    for a in alertes:
+        economie = a['ancien_prix'] - a['nouveau_prix']
+        pourcentage = (economie / a['ancien_prix']) * 100
+        if economie > 0:
+            detail = f"Économie: {economie:.2f}€ (-{pourcentage:.1f}%)"
+        else:
+            detail = a.get('message', '')
+        
+        corps += f"""
+        <div class='alerte'>
+            <div class='titre'>{a['titre'][:100]}</div>
+            <div class='prix'>
+                Ancien prix: <span class='ancien'>{a['ancien_prix']:.2f}€</span><br>
+                Nouveau prix: <span class='nouveau'>{a['nouveau_prix']:.2f}€</span><br>
+                <span class='economie'>{detail}</span>
+            </div>
+            <p><a href='{a['url']}' class='lien'>VOIR LE PRODUIT</a></p>
+        </div>
+        """
+    
+    corps += """
+        <hr>
+        <p style='color: gray; font-size: 12px;'>
+            Email envoyé automatiquement par l'Analyseur Cdiscount<br>
+            Pour vous désabonner, ignorez simplement ces emails.
+        </p>
+    </body>
+    </html>
+    """
+    
+    msg.attach(MIMEText(corps, 'html'))
+    return msg
+
+def ouvrir_smtp(config_email):
+    """
+    Connexion SMTP authentifiée. Hôte et port configurables (smtp_host, smtp_port,
+    smtp_starttls dans config.json): Gmail par défaut, serveur local pour les tests
+    """
+    server = smtplib.SMTP(config_email.get('smtp_host', 'smtp.gmail.com'),
+                          int(config_email.get('smtp_port', 587)), timeout=30)
+    if config_email.get('smtp_starttls', True):
+        server.starttls()
+    if config_email.get('mot_de_passe'):
+        server.login(config_email['email_expediteur'], config_email['mot_de_passe'])
+    return server
+
 def envoyer_alerte_email(alertes, config_email):
-    """Envoie un email pour chaque baisse de prix détectée"""
-    if not alertes or not config_email:
+    """Envoie tout de suite un email récapitulant les alertes (sans passer par la file)"""
+    if not alertes or not email_configure(config_email):
         return False
     
     try:
-        expediteur = config_email.get('email_expediteur')
-        mot_de_passe = config_email.get('mot_de_passe')
-        destinataire = config_email.get('email_destinataire')
+        msg = construire_message(alertes, config_email)
         
-        if not all([expediteur, mot_de_passe, destinataire]):
-            return False
+        # Envoyer l'email
+        with METRIQUES.chrono("smtp"):
+            server = ouvrir_smtp(config_email)
+            server.send_message(msg)
+            server.quit()
+        METRIQUES.incrementer("emails_envoyes_total")
         
-        # Créer le message
-        msg = MIMEMultipart()
-        msg['Subject'] = f"🔔 ALERTE PRIX CDISCOUNT - {len(alertes)} baisse(s) détectée(s) !"
-        msg['From'] = expediteur
-        msg['To'] = destinataire
-        
-        # Corps du message en HTML
-        corps = """
-        <html>
-        <head>
-            <style>
-                body { font-family: Arial, sans-serif; }
-                .alerte { border: 1px solid #ccc; padding: 15px; margin: 10px 0; border-radius: 5px; }
-                .titre { font-size: 16px; font-weight: bold; color: #333; }
-                .prix { font-size: 14px; }
-                .ancien { color: red; text-decoration: line-through; }
-                .nouveau { color: green; font-weight: bold; font-size: 18px; }
-                .economie { color: #CC0000; font-weight: bold; }
-                .lien { background-color: #CC0000; color: white; padding: 5px 10px; 
-                        text-decoration: none; border-radius: 3px; display: inline-block; }
-            </style>
-        </head>
-        <body>
-            <h2>🛍️ Alertes de baisse de prix sur Cdiscount</h2>
+        logger.info(f"Email d'alerte envoyé à {msg['To']}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Erreur envoi email: {e}")
+        return False
+
+# ====================================
+# FILE D'ENVOI DES NOTIFICATIONS
+# ====================================
+class NotificationOutbox(SQLiteStore):
+    """
+    File d'alertes persistée dans DATA_DIR. Un thread d'envoi regroupe les alertes
+    par fenêtre de temps en un seul email, garde une connexion SMTP ouverte entre
+    deux envois et réessaie avec un délai croissant en cas d'échec.
+    """
+    
+    def __init__(self, config_provider, chemin=None, fenetre=60, delai_max=3600, bail=300):
+        """
+        config_provider : fonction qui retourne la configuration email courante
+        bail : durée pendant laquelle des alertes en cours d'envoi sont réservées
+        (outbox.db est partagé par l'interface, le démon et les lancements --batch)
         """
+        super().__init__(chemin or FICHIER_OUTBOX)
+        self._connexion().executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                alerte TEXT NOT NULL,
+                cree_le REAL NOT NULL,
+                tentatives INTEGER NOT NULL DEFAULT 0,
+                prochain_essai REAL NOT NULL,
+                envoye_le REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_attente ON outbox (envoye_le, prochain_essai);
+        """)
+        self.config_provider = config_provider
+        self.fenetre = fenetre
+        self.delai_max = delai_max
+        self.bail = bail
+        self._smtp = None
+        self._smtp_config = None
+        self._arret = threading.Event()
+        self._reveil = threading.Event()
+        self._thread = None
+    
+    def ajouter(self, alertes):
+        """Met des alertes en file (retour immédiat, l'envoi se fait en arrière-plan)"""
+        maintenant = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO outbox (alerte, cree_le, prochain_essai) VALUES (?, ?, ?)",
+                [(json.dumps(a, ensure_ascii=False), maintenant, maintenant) for a in alertes])
+    
+    def en_attente(self):
+        return self._connexion().execute(
+            "SELECT COUNT(*) FROM outbox WHERE envoye_le IS NULL").fetchone()[0]
+    
+    def demarrer(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._boucle, name="outbox", daemon=True)
+            self._thread.start()
+    
+    def arreter(self, vider=True):
+        """Arrête le thread d'envoi (en envoyant d'abord ce qui est prêt)"""
+        self._arret.set()
+        self._reveil.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+            self._thread = None
+        if vider:
+            self.envoyer_maintenant(forcer=True)
+        self._fermer_smtp()
+    
+    def _boucle(self):
+        while not self._arret.is_set():
+            self.envoyer_maintenant()
+            self._reveil.wait(min(self.fenetre, 30))
+            self._reveil.clear()
+    
+    def envoyer_maintenant(self, forcer=False):
+        """
+        Envoie un récapitulatif des alertes prêtes. Sans `forcer`, on attend que la
+        plus ancienne ait `fenetre` secondes pour regrouper celles qui suivent.
+        Retourne True si un email est parti.
+        """
+        config = self.config_provider()
+        if not email_configure(config):
+            return False
         
-        for a in alertes:
-            economie = a['ancien_prix'] - a['nouveau_prix']
-            pourcentage = (economie / a['ancien_prix']) * 100
-            
-            corps += f"""
-            <div class='alerte'>
-                <div class='titre'>{a['titre'][:100]}</div>
-                <div class='prix'>
-                    Ancien prix: <span class='ancien'>{a['ancien_prix']:.2f}€</span><br>
-                    Nouveau prix: <span class='nouveau'>{a['nouveau_prix']:.2f}€</span><br>
-                    <span class='economie'>Économie: {economie:.2f}€ (-{pourcentage:.1f}%)</span>
-                </div>
-                <p><a href='{a['url']}' class='lien'>VOIR LE PRODUIT</a></p>
-            </div>
-            """
+        maintenant = time.time()
+        # Les alertes sont réservées avant l'envoi: un autre processus qui vide la même
+        # file ne les voit plus jusqu'à la fin du bail (ou le prochain essai prévu)
+        with self.transaction() as conn:
+            lignes = conn.execute(
+                "SELECT id, alerte, cree_le, tentatives FROM outbox "
+                "WHERE envoye_le IS NULL AND prochain_essai <= ? ORDER BY id", (maintenant,)).fetchall()
+            if not lignes:
+                return False
+            if not forcer and min(l[2] for l in lignes) > maintenant - self.fenetre:
+                return False
+            conn.executemany("UPDATE outbox SET prochain_essai = ? WHERE id = ?",
+                             [(maintenant + self.bail, l[0]) for l in lignes])
+        
+        ids = [l[0] for l in lignes]
+        alertes = [json.loads(l[1]) for l in lignes]
+        try:
+            with METRIQUES.chrono("smtp"):
+                self._connexion_smtp(config).send_message(construire_message(alertes, config))
+        except Exception as e:
+            logger.error(f"Erreur envoi email (nouvel essai plus tard): {e}")
+            self._fermer_smtp()
+            with self.transaction() as conn:
+                conn.executemany(
+                    "UPDATE outbox SET tentatives = tentatives + 1, prochain_essai = ? WHERE id = ?",
+                    [(maintenant + min(self.delai_max, 30 * 2 ** tentatives), id_)
+                     for id_, _, _, tentatives in lignes])
+            return False
         
-        corps += """
-            <hr>
-            <p style='color: gray; font-size: 12px;'>
-                Email envoyé automatiquement par l'Analyseur Cdiscount<br>
-                Pour vous désabonner, ignorez simplement ces emails.
-            </p>
-        </body>
-        </html>
+        with self.transaction() as conn:
+            conn.executemany("UPDATE outbox SET envoye_le = ? WHERE id = ?",
+                             [(maintenant, id_) for id_ in ids])
+        METRIQUES.incrementer("emails_envoyes_total")
+        logger.info(f"Récapitulatif de {len(alertes)} alerte(s) envoyé à {config['email_destinataire']}")
+        return True
+    
+    def _connexion_smtp(self, config):
+        """Réutilise la connexion authentifiée tant qu'elle répond et que la config n'a pas changé"""
+        if self._smtp is not None and self._smtp_config == config:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except Exception:
+                pass
+        self._fermer_smtp()
+        self._smtp = ouvrir_smtp(config)
+        self._smtp_config = dict(config)
+        return self._smtp
+    
+    def _fermer_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+        self._smtp = None
+
+# ====================================
+# MODE BATCH (SANS INTERFACE)
+# ====================================
+def charger_watchlist(chemin):
+    """
+    Lit la watchlist: une requête ou une URL produit par ligne, '#' pour commenter,
+    avec un prix cible optionnel après '|' (ex: "iphone 13 | 550")
+    """
+    entrees = []
+    with open(chemin, "r", encoding="utf-8") as f:
+        for ligne in f:
+            ligne = ligne.strip()
+            if not ligne or ligne.startswith("#"):
+                continue
+            entree, _, cible = ligne.partition("|")
+            entrees.append({
+                'entree': entree.strip(),
+                'prix_cible': extraire_prix(cible) or None,
+            })
+    return entrees
+
+def est_url(entree):
+    return entree.startswith("http://") or entree.startswith("https://")
+
+def traiter_entree(scraper, entree, k=3, limite=None, pages=2):
+    """
+    Produits d'une entrée de watchlist: la fiche pour une URL, le top k pour une requête
+    limite : produits analysés par requête (max(k, MAX_PRODUITS) par défaut, 0 = sans limite)
+    pages : pages de résultats parcourues (0 = jusqu'à la dernière)
+    """
+    if est_url(entree):
+        produit = scraper.analyze_product(entree)
+        return scorer_produits([produit]) if produit else []
+    if limite is None:
+        limite = max(k, scraper.MAX_PRODUITS)
+    # Seuls les k meilleurs sont gardés: le flux n'est jamais stocké en entier
+    scraper.products = top_k(scraper.iter_products(entree, limit=limite or None, pages=pages or None), k)
+    return scraper.products
+
+def ecrire_rapport(sortie, type_ligne, **champs):
+    """Écrit une ligne JSON du rapport"""
+    ligne = {'type': type_ligne, 'horodatage': datetime.now().isoformat(timespec="seconds")}
+    ligne.update(champs)
+    sortie.write(json.dumps(ligne, ensure_ascii=False) + "\n")
+    sortie.flush()
+
+def executer_batch(entrees, sortie, workers=3, navigateurs=1, k=3, limite=None, pages=2,
+                   liste=False):
+    """
+    Traite toute la watchlist dans un seul processus (navigateurs partagés),
+    sans aucune fenêtre: résultats, historique et alertes sont écrits en JSON lines
+    """
+    config_email = EmailConfig.load()
+    outbox = NotificationOutbox(lambda: config_email)
+    pool = DriverPool(taille=navigateurs)
+    scraper = CdiscountScraper(pool=pool, workers=workers, liste_seule=liste)
+    toutes_alertes = []
+    code_retour = 0
+    
+    try:
+        # Les messages de progression vont sur stderr pour ne pas polluer le rapport
+        with redirect_stdout(sys.stderr):
+            for e in entrees:
+                entree = e['entree']
+                try:
+                    produits = traiter_entree(scraper, entree, k, limite, pages)
+                    cibles = {p.cle: e['prix_cible'] for p in produits if e['prix_cible']}
+                    alertes = sauvegarder_historique(produits, cibles=cibles) if produits else []
+                except NavigateurIndisponible:
+                    raise
+                except Exception as ex:
+                    # Une entrée en échec n'arrête pas le reste de la watchlist
+                    logger.error(f"Entrée {entree} en échec: {ex}")
+                    ecrire_rapport(sortie, "erreur", entree=entree, message=str(ex))
+                    continue
+                toutes_alertes.extend(alertes)
+                
+                for p in produits:
+                    ecrire_rapport(sortie, "produit", entree=entree, **p.to_dict())
+                for a in alertes:
+                    ecrire_rapport(sortie, "alerte", entree=entree, **a)
+                if not produits:
+                    ecrire_rapport(sortie, "vide", entree=entree)
+            
+            # Un seul récapitulatif pour tout le batch (plus les alertes restées en échec)
+            if email_configure(config_email):
+                outbox.ajouter(toutes_alertes)
+            email_envoye = outbox.envoyer_maintenant(forcer=True)
+    except NavigateurIndisponible as e:
+        logger.error(f"Batch interrompu: {e}")
+        ecrire_rapport(sortie, "erreur", message=str(e))
+        email_envoye = False
+        code_retour = 1
+    finally:
+        scraper.close()
+        pool.close()
+        outbox.arreter(vider=False)
+    
+    ecrire_rapport(sortie, "resume", entrees=len(entrees), alertes=len(toutes_alertes),
+                   email_envoye=email_envoye)
+    return code_retour
+
+# ====================================
+# MODE MULTI-PROCESSUS (FILE DE TRAVAUX)
+# ====================================
+class FileTravaux(SQLiteStore):
+    """
+    File de travaux durable partagée par plusieurs processus (DATA_DIR/travaux.db).
+    Un travail pris est loué pour `bail` secondes: si son processus meurt, il
+    redevient visible à l'expiration du bail et un autre processus le reprend.
+    """
+    
+    def __init__(self, chemin=None, bail=600, tentatives_max=3):
+        super().__init__(chemin or FICHIER_TRAVAUX)
+        self.bail = bail
+        self.tentatives_max = tentatives_max
+        self._connexion().executescript("""
+            CREATE TABLE IF NOT EXISTS travaux (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                lot TEXT NOT NULL,
+                entree TEXT NOT NULL,
+                prix_cible REAL,
+                etat TEXT NOT NULL DEFAULT 'attente',
+                proprietaire TEXT,
+                visible_le REAL NOT NULL DEFAULT 0,
+                tentatives INTEGER NOT NULL DEFAULT 0,
+                resultat TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_travaux_lot_etat ON travaux (lot, etat, visible_le);
+        """)
+    
+    def ajouter(self, lot, entrees):
+        with self.transaction() as conn:
+            conn.executemany("INSERT INTO travaux (lot, entree, prix_cible) VALUES (?, ?, ?)",
+                             [(lot, e['entree'], e['prix_cible']) for e in entrees])
+    
+    def prendre(self, lot, proprietaire):
+        """Loue le prochain travail visible du lot (None s'il n'y en a pas pour l'instant)"""
+        maintenant = time.time()
+        with self.transaction() as conn:
+            ligne = conn.execute(
+                "SELECT id, entree, prix_cible, tentatives FROM travaux "
+                "WHERE lot = ? AND etat = 'attente' AND visible_le <= ? ORDER BY id LIMIT 1",
+                (lot, maintenant)).fetchone()
+            if ligne is None:
+                return None
+            id_, entree, prix_cible, tentatives = ligne
+            if tentatives >= self.tentatives_max:
+                # Travail qui a déjà fait tomber (ou expirer) plusieurs processus
+                conn.execute("UPDATE travaux SET etat = 'echec' WHERE id = ?", (id_,))
+                return None
+            conn.execute("UPDATE travaux SET proprietaire = ?, visible_le = ?, tentatives = tentatives + 1 "
+                         "WHERE id = ?", (proprietaire, maintenant + self.bail, id_))
+        return {'id': id_, 'entree': entree, 'prix_cible': prix_cible}
+    
+    def prolonger(self, id_, proprietaire):
+        """Renouvelle le bail; False si le travail a expiré et a été repris ailleurs"""
+        with self.transaction() as conn:
+            return conn.execute("UPDATE travaux SET visible_le = ? WHERE id = ? AND proprietaire = ? "
+                                "AND etat = 'attente'",
+                                (time.time() + self.bail, id_, proprietaire)).rowcount == 1
+    
+    @contextmanager
+    def entretenir(self, id_, proprietaire):
+        """Prolonge le bail en arrière-plan tant que le travail est en cours (requêtes longues)"""
+        arret = threading.Event()
+        def battre():
+            while not arret.wait(self.bail / 3):
+                try:
+                    self.prolonger(id_, proprietaire)
+                except Exception as e:
+                    logger.error(f"Bail du travail {id_} non prolongé: {e}")
+        battement = threading.Thread(target=battre, daemon=True)
+        battement.start()
+        try:
+            yield
+        finally:
+            arret.set()
+            battement.join()
+    
+    def terminer(self, id_, proprietaire, resultat, etat="termine"):
+        """Enregistre le résultat, sauf si le bail a expiré et que le travail a été repris"""
+        with self.transaction() as conn:
+            conn.execute("UPDATE travaux SET etat = ?, resultat = ? WHERE id = ? AND proprietaire = ? "
+                         "AND etat = 'attente'",
+                         (etat, json.dumps(resultat, ensure_ascii=False), id_, proprietaire))
+    
+    def relacher(self, id_, proprietaire, delai=30):
+        """Rend le travail à la file après une erreur (visible à nouveau dans `delai` secondes)"""
+        with self.transaction() as conn:
+            conn.execute("UPDATE travaux SET visible_le = ? WHERE id = ? AND proprietaire = ? AND etat = 'attente'",
+                         (time.time() + delai, id_, proprietaire))
+    
+    def restants(self, lot):
+        return self._connexion().execute(
+            "SELECT COUNT(*) FROM travaux WHERE lot = ? AND etat = 'attente'", (lot,)).fetchone()[0]
+    
+    def resultats(self, lot, exclus=()):
+        """
+        Travaux terminés (ou abandonnés) du lot, hors ids de `exclus`: les processus
+        finissent dans le désordre, un seuil sur l'id perdrait les plus lents
         """
+        lignes = self._connexion().execute(
+            "SELECT id, entree, etat, resultat FROM travaux WHERE lot = ? AND etat != 'attente' "
+            "ORDER BY id", (lot,)).fetchall()
+        return [ligne for ligne in lignes if ligne[0] not in exclus]
+
+class LimiteurPartage(SQLiteStore):
+    """
+    Politesse commune à tous les processus: chaque requête réserve le prochain
+    créneau libre de l'hôte dans SQLite, puis dort jusqu'à ce créneau
+    (même interface que RateLimiter)
+    """
+    
+    def __init__(self, chemin=None):
+        super().__init__(chemin or FICHIER_TRAVAUX)
+        self._connexion().execute(
+            "CREATE TABLE IF NOT EXISTS creneaux (hote TEXT PRIMARY KEY, prochain REAL NOT NULL)")
+    
+    def attendre(self, url, delai):
+        hote = urlparse(url).netloc
+        with self.transaction() as conn:
+            maintenant = time.time()
+            ligne = conn.execute("SELECT prochain FROM creneaux WHERE hote = ?", (hote,)).fetchone()
+            creneau = max(maintenant, ligne[0] if ligne else 0)
+            conn.execute("INSERT OR REPLACE INTO creneaux (hote, prochain) VALUES (?, ?)",
+                         (hote, creneau + max(0, delai)))
+        if creneau > maintenant:
+            time.sleep(creneau - maintenant)
+
+def fichier_metriques_travailleur(pid):
+    return os.path.join(DATA_DIR, f"metriques-{pid}.json")
+
+def travailleur(lot, options):
+    """
+    Processus de travail: son propre pool de navigateurs et sa session HTTP,
+    des travaux pris dans la file jusqu'à ce qu'elle soit vide
+    """
+    global LIMITEUR
+    LIMITEUR = LimiteurPartage()
+    config = EmailConfig.load()
+    charger_bareme(config)
+    charger_profil_navigateur(config, options.get('chargement'))
+    charger_archive(config, options.get('archiver'))
+    charger_selecteurs(config)
+    charger_doublons(config)
+    
+    proprietaire = f"{platform.node()}:{os.getpid()}"
+    file_travaux = FileTravaux()
+    pool = DriverPool(taille=options['navigateurs'])
+    scraper = CdiscountScraper(pool=pool, workers=options['workers'], liste_seule=options['liste'])
+    try:
+        with redirect_stdout(sys.stderr):
+            while True:
+                travail = file_travaux.prendre(lot, proprietaire)
+                if travail is None:
+                    # Des travaux loués ailleurs peuvent encore revenir (bail expiré)
+                    if file_travaux.restants(lot) == 0:
+                        return
+                    time.sleep(1)
+                    continue
+                
+                try:
+                    with file_travaux.entretenir(travail['id'], proprietaire):
+                        produits = traiter_entree(scraper, travail['entree'], options['k'],
+                                                  options['limite'], options['pages'])
+                    # Bail perdu malgré tout (processus gelé): le travail est à un autre processus,
+                    # qui écrira l'historique et les alertes; rien n'est écrit ici
+                    if not file_travaux.prolonger(travail['id'], proprietaire):
+                        logger.warning(f"Travail {travail['id']} repris par un autre processus, résultat abandonné")
+                        continue
+                    cibles = {p.cle: travail['prix_cible'] for p in produits if travail['prix_cible']}
+                    # La transaction de sauvegarder_historique sérialise les processus sur les agrégats
+                    alertes = sauvegarder_historique(produits, cibles=cibles) if produits else []
+                except NavigateurIndisponible as e:
+                    file_travaux.terminer(travail['id'], proprietaire, {'erreur': str(e)}, etat="echec")
+                    return
+                except Exception as e:
+                    logger.error(f"Travail {travail['id']} en échec: {e}")
+                    file_travaux.relacher(travail['id'], proprietaire)
+                    continue
+                
+                file_travaux.terminer(travail['id'], proprietaire, {
+                    'produits': [p.to_dict() for p in produits],
+                    'alertes': alertes,
+                })
+    finally:
+        scraper.close()
+        pool.close()
+        # Fusionnées dans le fichier commun, relu avant chaque écriture
+        STATS_SELECTEURS.sauver()
+        # Métriques du processus, ajoutées à celles du parent avant son export
+        METRIQUES.sauver_etat(fichier_metriques_travailleur(os.getpid()))
+
+def executer_batch_processus(entrees, sortie, processus=2, workers=3, navigateurs=1, k=3,
+                             limite=None, pages=2, chargement=None, liste=False):
+    """
+    Répartit la watchlist entre plusieurs processus qui se partagent une file
+    de travaux SQLite; le rapport et l'email récapitulatif restent uniques
+    """
+    lot = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    file_travaux = FileTravaux()
+    file_travaux.ajouter(lot, entrees)
+    options = {'workers': workers, 'navigateurs': navigateurs, 'k': k, 'limite': limite,
+               'pages': pages, 'chargement': chargement, 'liste': liste, 'archiver': ARCHIVE_ACTIVE}
+    
+    processus_lances = [multiprocessing.Process(target=travailleur, args=(lot, options))
+                        for _ in range(max(1, min(processus, len(entrees))))]
+    for p in processus_lances:
+        p.start()
+    
+    config_email = EmailConfig.load()
+    outbox = NotificationOutbox(lambda: config_email)
+    toutes_alertes = []
+    code_retour = 0
+    rapportes = set()
+    
+    def lire_resultats():
+        nonlocal code_retour
+        for id_, entree, etat, resultat in file_travaux.resultats(lot, rapportes):
+            rapportes.add(id_)
+            resultat = json.loads(resultat) if resultat else {}
+            if etat == "echec":
+                code_retour = 1
+                ecrire_rapport(sortie, "erreur", entree=entree,
+                               message=resultat.get('erreur', "trop de tentatives"))
+                continue
+            for produit in resultat.get('produits', []):
+                ecrire_rapport(sortie, "produit", entree=entree, **produit)
+            for a in resultat.get('alertes', []):
+                ecrire_rapport(sortie, "alerte", entree=entree, **a)
+            if not resultat.get('produits'):
+                ecrire_rapport(sortie, "vide", entree=entree)
+            toutes_alertes.extend(resultat.get('alertes', []))
+    
+    try:
+        while any(p.is_alive() for p in processus_lances):
+            lire_resultats()
+            time.sleep(0.5)
+        lire_resultats()
         
-        msg.attach(MIMEText(corps, 'html'))
+        restants = file_travaux.restants(lot)
+        if restants:
+            logger.error(f"Batch multi-processus: {restants} entrée(s) non traitée(s)")
+            ecrire_rapport(sortie, "erreur", message=f"{restants} entrée(s) non traitée(s)")
+            code_retour = 1
         
-        # Envoyer l'email
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(expediteur, mot_de_passe)
-        server.send_message(msg)
-        server.quit()
+        with redirect_stdout(sys.stderr):
+            if email_configure(config_email):
+                outbox.ajouter(toutes_alertes)
+            email_envoye = outbox.envoyer_maintenant(forcer=True)
+    finally:
+        for p in processus_lances:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+            if os.path.exists(fichier_metriques_travailleur(p.pid)):
+                METRIQUES.fusionner(fichier_metriques_travailleur(p.pid))
+        outbox.arreter(vider=False)
+    
+    ecrire_rapport(sortie, "resume", entrees=len(entrees), alertes=len(toutes_alertes),
+                   email_envoye=email_envoye, processus=len(processus_lances))
+    return code_retour
+
+# ====================================
+# RÉ-EXTRACTION DEPUIS L'ARCHIVE
+# ====================================
+def _reextraire_contenus(chemin_archive, candidats, lot):
+    """
+    Processus de ré-extraction: [(empreinte, [(url, date), ...]), ...] -> lignes d'observation.
+    Chaque contenu n'est analysé qu'une fois, quel que soit le nombre de fois où il a été récupéré.
+    """
+    # Sélecteurs de prix du processus parent, y compris ceux ajoutés dans config.json
+    STATS_SELECTEURS.candidats = candidats
+    archive = ArchivePages(chemin_archive)
+    lignes = []
+    sans_produit = 0
+    for empreinte, recuperations in lot:
+        html = archive.corps(empreinte)
+        champs = extraire_champs_html(html) if html else None
+        for url, date in recuperations:
+            produit = interpreter_champs(champs, url) if champs else None
+            if produit is None:
+                sans_produit += 1
+                continue
+            lignes.append((produit.cle, produit.title, produit.price, produit.url, int(date)))
+    return lignes, sans_produit
+
+def reextraire_archive(processus=None, depuis=0, archive=None, store=None, taille_lot=50):
+    """
+    Relance les extracteurs actuels sur toutes les fiches produit archivées, dans un pool
+    de processus, et complète l'historique (aucune requête réseau). Le relevé en direct
+    d'une page archivée est corrigé plutôt que doublé; les agrégats des produits touchés
+    seront recalculés.
+    """
+    archive = archive or ArchivePages()
+    store = store or get_price_store()
+    par_contenu = list(archive.releves("produit", depuis).items())
+    lots = [par_contenu[i:i + taille_lot] for i in range(0, len(par_contenu), taille_lot)]
+    
+    bilan = {'pages': sum(len(r) for _, r in par_contenu), 'contenus': len(par_contenu),
+             'observations': 0, 'ajoutees': 0, 'corrigees': 0, 'sans_produit': 0}
+    produits = set()
+    with ProcessPoolExecutor(max_workers=processus) as executor:
+        for lignes, sans_produit in executor.map(_reextraire_contenus, itertools.repeat(archive.chemin),
+                                                  itertools.repeat(STATS_SELECTEURS.candidats), lots):
+            bilan['observations'] += len(lignes)
+            bilan['sans_produit'] += sans_produit
+            ajoutees, corrigees = store.completer(lignes)
+            bilan['ajoutees'] += ajoutees
+            bilan['corrigees'] += corrigees
+            produits.update(l[0] for l in lignes)
+    store.oublier_agregats(produits)
+    bilan['produits'] = len(produits)
+    return bilan
+
+# ====================================
+# PLANIFICATEUR ADAPTATIF (MODE DAEMON)
+# ====================================
+def calculer_intervalle(historique, prix, prix_cible=None, intervalle_min=15 * 60,
+                        intervalle_max=24 * 3600):
+    """
+    Intervalle de relevé d'un produit (secondes): court si le prix bouge souvent
+    ou s'approche du prix cible, long si le prix est stable
+    """
+    intervalle = intervalle_max
+    
+    # Volatilité: variation relative cumulée par jour sur l'historique récent
+    if len(historique) >= 2:
+        variation = sum(abs(p2 - p1) / p1 for (_, p1), (_, p2) in zip(historique, historique[1:]) if p1 > 0)
+        jours = max((historique[-1][0] - historique[0][0]) / 86400, 1 / 24)
+        taux = variation / jours
+        intervalle = intervalle_max / (1 + 100 * taux)  # 1 %/jour -> intervalle divisé par 2
+    
+    # Proximité du seuil: à moins de 10 % du prix cible, on resserre proportionnellement
+    if prix_cible and prix:
+        ecart = (prix - prix_cible) / prix_cible
+        intervalle *= min(1, max(0.1, ecart / 0.10))
+    
+    return int(min(intervalle_max, max(intervalle_min, intervalle)))
+
+class PollingScheduler:
+    """
+    Relève chaque produit suivi à son propre rythme (calculer_intervalle).
+    Les requêtes de la watchlist servent à découvrir les produits à suivre
+    et sont relancées à intervalle fixe.
+    """
+    
+    FENETRE_VOLATILITE = 7 * 86400
+    
+    def __init__(self, scraper, entrees, store=None, intervalle_min=15 * 60,
+                 intervalle_max=24 * 3600, intervalle_decouverte=6 * 3600, k=3,
+                 limite=None, pages=2):
+        self.scraper = scraper
+        self.store = store or get_price_store()
+        self.moteur = MoteurRegles()
+        self.intervalle_min = intervalle_min
+        self.intervalle_max = intervalle_max
+        self.intervalle_decouverte = intervalle_decouverte
+        self.k = k
+        self.limite = limite
+        self.pages = pages
+        self.suivis = {}     # cle -> {'url', 'entree', 'prix_cible', 'intervalle'}
+        self._file = []      # tas de (échéance, cle)
         
-        logger.info(f"Email d'alerte envoyé à {destinataire}")
-        return True
+        maintenant = time.time()
+        for e in entrees:
+            if est_url(e['entree']):
+                cle = extraire_id_produit(e['entree'])[0] or e['entree']
+                self._suivre(cle, e['entree'], e['entree'], e['prix_cible'], maintenant)
+            else:
+                heapq.heappush(self._file, (maintenant, "requete:" + e['entree']))
+                self.suivis["requete:" + e['entree']] = {'entree': e['entree'], 'prix_cible': e['prix_cible'],
+                                                         'intervalle': intervalle_decouverte}
+    
+    def _suivre(self, cle, url, entree, prix_cible, echeance):
+        if cle not in self.suivis:
+            self.suivis[cle] = {'url': url, 'entree': entree, 'prix_cible': prix_cible,
+                                'intervalle': self.intervalle_min}
+            heapq.heappush(self._file, (echeance, cle))
+    
+    def prochaine_echeance(self):
+        return self._file[0][0] if self._file else None
+    
+    def executer_suivant(self):
+        """Relève l'élément le plus en retard, replanifie et retourne (entree, produits, alertes)"""
+        _, cle = heapq.heappop(self._file)
+        suivi = self.suivis[cle]
+        maintenant = time.time()
         
-    except Exception as e:
-        logger.error(f"Erreur envoi email: {e}")
-        return False
+        try:
+            if cle.startswith("requete:"):
+                produits = traiter_entree(self.scraper, suivi['entree'], self.k, self.limite, self.pages)
+                # Les produits découverts sont relevés à leur propre rythme ensuite
+                for p in produits:
+                    self._suivre(p.cle, p.url, suivi['entree'], suivi['prix_cible'],
+                                 maintenant + self.intervalle_min)
+            else:
+                produit = self.scraper.analyze_product(suivi['url'])
+                produits = scorer_produits([produit]) if produit else []
+            
+            cibles = {p.cle: suivi['prix_cible'] for p in produits if suivi['prix_cible']}
+            alertes = sauvegarder_historique(produits, self.store, self.moteur, cibles) if produits else []
+        except Exception:
+            # Retenté au prochain intervalle au lieu de disparaître de la file
+            heapq.heappush(self._file, (maintenant + suivi['intervalle'], cle))
+            raise
+        
+        if not cle.startswith("requete:"):
+            historique = self.store.historique(cle, depuis=maintenant - self.FENETRE_VOLATILITE)
+            prix = produits[0].price if produits else None
+            suivi['intervalle'] = calculer_intervalle(historique, prix, suivi['prix_cible'],
+                                                      self.intervalle_min, self.intervalle_max)
+        heapq.heappush(self._file, (maintenant + suivi['intervalle'], cle))
+        return suivi['entree'], produits, alertes
+    
+    def boucle(self, sortie, arret=None, outbox=None):
+        """Tourne jusqu'à ce que `arret` (threading.Event) soit levé"""
+        arret = arret or threading.Event()
+        while not arret.is_set() and self._file:
+            attente = self.prochaine_echeance() - time.time()
+            if attente > 0 and arret.wait(attente):
+                break
+            
+            entree = self.suivis[self._file[0][1]]['entree']
+            try:
+                entree, produits, alertes = self.executer_suivant()
+            except NavigateurIndisponible:
+                raise
+            except Exception as e:
+                logger.error(f"Relevé de {entree} en échec: {e}")
+                ecrire_rapport(sortie, "erreur", entree=entree, message=str(e))
+                continue
+            for p in produits:
+                ecrire_rapport(sortie, "produit", entree=entree, **p.to_dict())
+            for a in alertes:
+                ecrire_rapport(sortie, "alerte", entree=entree, **a)
+            if alertes and outbox and email_configure(outbox.config_provider()):
+                outbox.ajouter(alertes)
+            METRIQUES.exporter(intervalle=60)
+            STATS_SELECTEURS.sauver(intervalle=60)
+
+def executer_daemon(entrees, sortie, workers=3, navigateurs=1, intervalle_min=15 * 60,
+                    intervalle_max=24 * 3600, k=3, limite=None, pages=2, liste=False):
+    """Surveille la watchlist en continu (Ctrl+C pour arrêter)"""
+    pool = DriverPool(taille=navigateurs)
+    scraper = CdiscountScraper(pool=pool, workers=workers, liste_seule=liste)
+    planificateur = PollingScheduler(scraper, entrees, intervalle_min=intervalle_min,
+                                     intervalle_max=intervalle_max, k=k,
+                                     limite=limite, pages=pages)
+    config_email = EmailConfig.load()
+    outbox = NotificationOutbox(lambda: config_email)
+    outbox.demarrer()
+    try:
+        with redirect_stdout(sys.stderr):
+            planificateur.boucle(sortie, outbox=outbox)
+    except KeyboardInterrupt:
+        pass
+    except NavigateurIndisponible as e:
+        logger.error(f"Daemon interrompu: {e}")
+        ecrire_rapport(sortie, "erreur", message=str(e))
+        return 1
+    finally:
+        scraper.close()
+        pool.close()
+        outbox.arreter()
+    return 0
 
 # ====================================
 # INTERFACE GRAPHIQUE
 # ====================================
 class Application:
     def __init__(self):
+        charger_tkinter()
         self.config_email = EmailConfig.load()
+        # Sessions navigateur gardées au chaud entre deux analyses
+        self.pool = DriverPool(taille=1)
+        # Les emails partent en arrière-plan, sans bloquer la fenêtre
+        self.outbox = NotificationOutbox(lambda: self.config_email)
+        self.outbox.demarrer()
+        self.annulation = threading.Event()
         self.setup_gui()
     
     def setup_gui(self):
         self.fenetre = tk.Tk()
         self.fenetre.title("Analyseur Cdiscount")
         self.fenetre.geometry("850x750")
+        self.fenetre.protocol("WM_DELETE_WINDOW", self.quitter)
         
         # Menu
         menubar = tk.Menu(self.fenetre)
@@ -614,8 +3474,8 @@ class Application:
         
         # État email
         self.email_status = tk.Label(self.fenetre, 
-                                     text="✓ Alertes email actives" if self.config_email else "✗ Alertes email non configurées",
-                                     fg="green" if self.config_email else "red",
+                                     text="✓ Alertes email actives" if email_configure(self.config_email) else "✗ Alertes email non configurées",
+                                     fg="green" if email_configure(self.config_email) else "red",
                                      font=("Arial", 9))
         self.email_status.pack()
         
@@ -630,7 +3490,15 @@ class Application:
                                command=self.lancer_analyse,
                                bg="#CC0000", fg="white", font=("Arial", 12, "bold"), 
                                height=2, width=20)
-        self.bouton.pack(pady=20)
+        self.bouton.pack(pady=(20, 5))
+        
+        # Progression et annulation
+        self.progression = ttk.Progressbar(self.fenetre, length=300, mode="determinate",
+                                           maximum=CdiscountScraper.MAX_PRODUITS)
+        self.progression.pack(pady=5)
+        self.bouton_annuler = tk.Button(self.fenetre, text="⏹️ Annuler", command=self.annuler_analyse,
+                                        state="disabled")
+        self.bouton_annuler.pack(pady=(0, 10))
         
         # Résultats
         tk.Label(self.fenetre, text="Résultats:").pack()
@@ -644,7 +3512,7 @@ class Application:
                 font=("Arial", 8), fg="gray").pack()
         
         # Vérifier si besoin de config email au premier lancement
-        if not self.config_email:
+        if not email_configure(self.config_email):
             self.fenetre.after(1000, self.demander_config_email)
     
     def demander_config_email(self):
@@ -661,8 +3529,9 @@ class Application:
         """Ouvre la fenêtre de configuration email"""
         config = EmailConfig.ask_email_config()
         if config:
-            self.config_email = config
             EmailConfig.save(config)
+            # Configuration complète (smtp_host, smtp_port...), pas seulement les champs du dialogue
+            self.config_email = EmailConfig.load()
             self.email_status.config(text="✓ Alertes email actives", fg="green")
             messagebox.showinfo("Succès", "Configuration email sauvegardée !")
     
@@ -686,70 +3555,133 @@ class Application:
             return
         
         self.bouton.config(state="disabled", text="Analyse en cours...")
-        self.fenetre.update()
+        self.bouton_annuler.config(state="normal")
+        self.progression.config(value=0)
         
         self.text_resultat.config(state="normal")
         self.text_resultat.delete("1.0", tk.END)
+        self.text_resultat.insert(tk.END, f"🔎 Recherche: {produit}\n\n")
+        self.text_resultat.config(state="disabled")
         
+        # Le scraping tourne dans un thread; la fenêtre lit ses résultats via une file
+        self.annulation = threading.Event()
+        self.file_resultats = queue.Queue()
+        threading.Thread(target=self._analyser, args=(produit, self.annulation, self.file_resultats),
+                         daemon=True).start()
+        self.fenetre.after(100, self._verifier_file)
+    
+    def annuler_analyse(self):
+        self.annulation.set()
+        self.bouton_annuler.config(state="disabled", text="Annulation...")
+    
+    def _analyser(self, produit, annulation, file_resultats):
+        """Thread de travail: ne touche jamais aux widgets, tout passe par la file"""
         scraper = None
         try:
-            scraper = CdiscountScraper()
-            scraper.search_products(produit)
+            scraper = CdiscountScraper(pool=self.pool, workers=3)
+            scraper.search_products(produit, rappel=lambda p: file_resultats.put(("produit", p)),
+                                    annulation=annulation)
             top_3 = scraper.get_top_3()
             
-            if top_3:
-                # Sauvegarder et vérifier les alertes
-                alertes = sauvegarder_historique(top_3)
-                
-                # Afficher les résultats
-                self.text_resultat.insert(tk.END, f"TOP 3 POUR: {produit}\n")
-                self.text_resultat.insert(tk.END, "="*40 + "\n\n")
-                
-                for p in top_3:
-                    self.text_resultat.insert(tk.END, f"{p.rank}. {p.recommendation}\n")
-                    self.text_resultat.insert(tk.END, f"📦 {p.title[:70]}\n")
-                    self.text_resultat.insert(tk.END, f"💰 {p.price}€")
-                    if p.note > 0:
-                        self.text_resultat.insert(tk.END, f" | ⭐ {p.note}/5")
-                    self.text_resultat.insert(tk.END, f"\n📦 {p.livraison}\n")
-                    self.text_resultat.insert(tk.END, f"📊 Score: {p.score}/10\n")
-                    self.text_resultat.insert(tk.END, "-"*30 + "\n\n")
-                
-                # Gérer les alertes
-                if alertes:
-                    self.text_resultat.insert(tk.END, "📉 BAISSES DE PRIX DÉTECTÉES !\n")
-                    for a in alertes:
-                        economie = a['ancien_prix'] - a['nouveau_prix']
-                        self.text_resultat.insert(tk.END, 
-                            f"   {a['titre'][:50]}...\n"
-                            f"   {a['ancien_prix']}€ -> {a['nouveau_prix']}€ "
-                            f"(économies: {economie:.2f}€)\n\n"
-                        )
-                    
-                    # Envoyer les alertes par email si configuré
-                    if self.config_email:
-                        if envoyer_alerte_email(alertes, self.config_email):
-                            self.text_resultat.insert(tk.END, "📧 ALERTES EMAIL ENVOYÉES !\n\n")
-                        else:
-                            self.text_resultat.insert(tk.END, "⚠️ Échec envoi email\n\n")
-                    else:
-                        self.text_resultat.insert(tk.END, 
-                            "ℹ️ Configurez l'email dans le menu pour recevoir des alertes\n\n")
-                
-                messagebox.showinfo("", f"Terminé! {len(top_3)} produits trouvés.")
-            else:
-                self.text_resultat.insert(tk.END, "Aucun produit trouvé.\n")
-                messagebox.showwarning("", "Aucun produit trouvé!")
-                
+            # Sauvegarder et vérifier les alertes
+            alertes = sauvegarder_historique(top_3) if top_3 else []
+            if alertes and email_configure(self.config_email):
+                self.outbox.ajouter(alertes)
+            
+            file_resultats.put(("fin", produit, top_3, alertes))
+        except NavigateurIndisponible as e:
+            file_resultats.put(("navigateur", str(e)))
         except Exception as e:
             logger.error(f"Erreur: {e}")
-            self.text_resultat.insert(tk.END, f"❌ Erreur: {str(e)[:200]}\n")
+            file_resultats.put(("erreur", str(e)))
         finally:
             if scraper:
                 scraper.close()
-            
+    
+    def _verifier_file(self):
+        """Affiche les messages du thread de travail (appelé par fenetre.after)"""
+        termine = False
+        self.text_resultat.config(state="normal")
+        try:
+            while not termine:
+                message = self.file_resultats.get_nowait()
+                if message[0] == "produit":
+                    p = message[1]
+                    self.progression.step(1)
+                    self.text_resultat.insert(tk.END, f"✔️ {p.title[:60]} - {p.price}€\n")
+                    self.text_resultat.see(tk.END)
+                else:
+                    termine = True
+                    self._afficher_fin(message)
+        except queue.Empty:
+            pass
+        self.text_resultat.config(state="disabled")
+        
+        if termine:
+            self.progression.config(value=self.progression["maximum"])
             self.bouton.config(state="normal", text="🚀 LANCER L'ANALYSE")
-            self.text_resultat.config(state="disabled")
+            self.bouton_annuler.config(state="disabled", text="⏹️ Annuler")
+        else:
+            self.fenetre.after(100, self._verifier_file)
+    
+    def _afficher_fin(self, message):
+        METRIQUES.exporter()
+        STATS_SELECTEURS.sauver()
+        if message[0] == "navigateur":
+            self.text_resultat.insert(tk.END, f"❌ Erreur: {message[1][:200]}\n")
+            messagebox.showerror("Erreur navigateur", message[1])
+            return
+        if message[0] == "erreur":
+            self.text_resultat.insert(tk.END, f"❌ Erreur: {message[1][:200]}\n")
+            return
+        
+        _, produit, top_3, alertes = message
+        if self.annulation.is_set():
+            self.text_resultat.insert(tk.END, "\n⏹️ Analyse annulée\n")
+        
+        if top_3:
+            # Afficher les résultats
+            self.text_resultat.insert(tk.END, f"\nTOP 3 POUR: {produit}\n")
+            self.text_resultat.insert(tk.END, "="*40 + "\n\n")
+            
+            for p in top_3:
+                self.text_resultat.insert(tk.END, f"{p.rank}. {p.recommendation}\n")
+                self.text_resultat.insert(tk.END, f"📦 {p.title[:70]}\n")
+                self.text_resultat.insert(tk.END, f"💰 {p.price}€")
+                if p.note > 0:
+                    self.text_resultat.insert(tk.END, f" | ⭐ {p.note}/5")
+                self.text_resultat.insert(tk.END, f"\n📦 {p.livraison}\n")
+                self.text_resultat.insert(tk.END, f"📊 Score: {p.score}/10\n")
+                self.text_resultat.insert(tk.END, "-"*30 + "\n\n")
+            
+            # Gérer les alertes
+            if alertes:
+                self.text_resultat.insert(tk.END, "📉 ALERTES DE PRIX DÉTECTÉES !\n")
+                for a in alertes:
+                    self.text_resultat.insert(tk.END, 
+                        f"   {a['titre'][:50]}...\n"
+                        f"   {a['ancien_prix']}€ -> {a['nouveau_prix']}€ "
+                        f"({a.get('message', '')})\n\n"
+                    )
+                
+                if email_configure(self.config_email):
+                    self.text_resultat.insert(tk.END, "📧 Alertes ajoutées à la file d'envoi email\n\n")
+                else:
+                    self.text_resultat.insert(tk.END, 
+                        "ℹ️ Configurez l'email dans le menu pour recevoir des alertes\n\n")
+            
+            self.text_resultat.see(tk.END)
+            messagebox.showinfo("", f"Terminé! {len(top_3)} produits trouvés.")
+        else:
+            self.text_resultat.insert(tk.END, "Aucun produit trouvé.\n")
+            messagebox.showwarning("", "Aucun produit trouvé!")
+    
+    def quitter(self):
+        """Ferme les navigateurs du pool et envoie les emails en attente avant de quitter"""
+        self.annulation.set()
+        self.pool.close()
+        self.outbox.arreter()
+        self.fenetre.destroy()
     
     def run(self):
         self.fenetre.mainloop()
@@ -757,7 +3689,100 @@ class Application:
 # ====================================
 # POINT D'ENTRÉE
 # ====================================
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyseur de prix Cdiscount")
+    parser.add_argument("--setup", action="store_true",
+                        help="installe les dépendances et prépare le driver du navigateur, puis quitte")
+    parser.add_argument("--batch", metavar="WATCHLIST",
+                        help="mode sans interface: fichier avec une requête ou une URL par ligne")
+    parser.add_argument("--sortie", default="-",
+                        help="rapport JSON lines du mode batch (défaut: sortie standard)")
+    parser.add_argument("--workers", type=int, default=3,
+                        help="fiches produit analysées en parallèle")
+    parser.add_argument("--navigateurs", type=int, default=1,
+                        help="sessions Chrome gardées ouvertes pendant le batch")
+    parser.add_argument("--processus", type=int, default=1,
+                        help="batch: processus qui se partagent la watchlist (chacun avec ses navigateurs), ou pool de --reextraire")
+    parser.add_argument("--top", type=int, default=3,
+                        help="nombre de meilleures offres retenues par requête")
+    parser.add_argument("--limite", type=int, default=None,
+                        help="produits analysés par requête (défaut: max(top, 5), 0 = sans limite)")
+    parser.add_argument("--pages", type=int, default=2,
+                        help="pages de résultats parcourues par requête (0 = toutes)")
+    parser.add_argument("--liste", action="store_true",
+                        help="lit les produits sur les pages de résultats, fiche ouverte seulement si un champ manque")
+    parser.add_argument("--daemon", action="store_true",
+                        help="avec --batch: surveille la watchlist en continu, rythme adapté à chaque produit")
+    parser.add_argument("--intervalle-min", type=float, default=15,
+                        help="daemon: intervalle minimal entre deux relevés d'un produit (minutes)")
+    parser.add_argument("--intervalle-max", type=float, default=24 * 60,
+                        help="daemon: intervalle maximal pour un produit stable (minutes)")
+    parser.add_argument("--chargement", choices=["leger", "complet"],
+                        help="pages Selenium: 'leger' (texte seul, par défaut) ou 'complet' (images, polices...)")
+    parser.add_argument("--archiver", action="store_true",
+                        help="garde chaque page récupérée dans data/archive_pages.db (compressée, dédupliquée)")
+    parser.add_argument("--reextraire", action="store_true",
+                        help="relance l'extraction sur l'archive et complète l'historique, sans réseau")
+    parser.add_argument("--profil", action="store_true",
+                        help="profile le lancement avec cProfile (fichier .pstats dans le dossier data)")
+    args = parser.parse_args(argv)
+    if args.setup:
+        return installer()
+    config = EmailConfig.load()
+    charger_bareme(config)
+    charger_profil_navigateur(config, args.chargement)
+    charger_archive(config, args.archiver)
+    charger_selecteurs(config)
+    charger_doublons(config)
+    
+    with profil_execution(args.profil):
+        try:
+            return lancer(args)
+        finally:
+            # Compteurs et durées par étape: data/metriques.prom et data/metriques.json
+            METRIQUES.exporter()
+            STATS_SELECTEURS.sauver()
+
+def installer():
+    """Installation explicite: paquets pip, puis driver du navigateur mémorisé dans pilotes.json"""
+    auto_install()
+    for navigateur in (["chrome", "edge"] if platform.system() == "Windows" else ["chrome"]):
+        try:
+            print(f"✅ Driver {navigateur}: {chemin_pilote(navigateur)}")
+            return 0
+        except Exception as e:
+            print(f"⚠️ Driver {navigateur} indisponible: {str(e)[:100]}")
+    return 1
+
+def lancer(args):
+    """Mode batch / daemon selon les options, sinon interface graphique"""
+    if args.reextraire:
+        print("🔁 Ré-extraction de l'archive des pages...")
+        bilan = reextraire_archive(args.processus if args.processus > 1 else None)
+        print(f"✅ {bilan['pages']} page(s) archivée(s), {bilan['contenus']} contenu(s) distinct(s) analysé(s)")
+        print(f"   {bilan['observations']} relevé(s) extrait(s) pour {bilan['produits']} produit(s), "
+              f"{bilan['ajoutees']} ajouté(s) et {bilan['corrigees']} corrigé(s) dans l'historique, "
+              f"{bilan['sans_produit']} page(s) sans produit")
+        return 0
+    
+    if args.batch:
+        entrees = charger_watchlist(args.batch)
+        sortie = sys.stdout if args.sortie == "-" else open(args.sortie, "a", encoding="utf-8")
+        try:
+            if args.daemon:
+                return executer_daemon(entrees, sortie, args.workers, args.navigateurs,
+                                       int(args.intervalle_min * 60), int(args.intervalle_max * 60), args.top,
+                                       args.limite, args.pages, args.liste)
+            if args.processus > 1:
+                return executer_batch_processus(entrees, sortie, args.processus, args.workers,
+                                                args.navigateurs, args.top, args.limite, args.pages,
+                                                args.chargement, args.liste)
+            return executer_batch(entrees, sortie, args.workers, args.navigateurs, args.top,
+                                  args.limite, args.pages, args.liste)
+        finally:
+            if sortie is not sys.stdout:
+                sortie.close()
+    
     print("="*50)
     print("🛍️ ANALYSEUR CDISCOUNT - AVEC ALERTES EMAIL")
     print("="*50)
@@ -765,4 +3790,8 @@ if __name__ == "__main__":
     print("="*50 + "\n")
     
     app = Application()
-    app.run()
\ No newline at end of file
+    app.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
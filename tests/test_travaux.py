@@ -0,0 +1,24 @@
+import main
+
+
+def test_resultats_termines_dans_le_desordre(tmp_path):
+    file_travaux = main.FileTravaux(str(tmp_path / "travaux.db"))
+    file_travaux.ajouter("lot", [{'entree': "a", 'prix_cible': None},
+                                 {'entree': "b", 'prix_cible': None}])
+    travail_a = file_travaux.prendre("lot", "p1")
+    travail_b = file_travaux.prendre("lot", "p2")
+    rapportes = set()
+
+    # Le travail 2 finit avant le travail 1
+    file_travaux.terminer(travail_b['id'], "p2", {'produits': []})
+    lus = file_travaux.resultats("lot", rapportes)
+    assert [entree for _, entree, _, _ in lus] == ["b"]
+    rapportes.update(id_ for id_, _, _, _ in lus)
+
+    file_travaux.terminer(travail_a['id'], "p1", {'produits': []})
+    lus = file_travaux.resultats("lot", rapportes)
+    assert [entree for _, entree, _, _ in lus] == ["a"]
+    rapportes.update(id_ for id_, _, _, _ in lus)
+
+    assert file_travaux.resultats("lot", rapportes) == []
+    assert file_travaux.restants("lot") == 0